@@ -1,16 +1,31 @@
-import socket
+import asyncio
+import dataclasses
+import multiprocessing
+import threading
 from random import choice
 from time import sleep
 from lib.FSMs_states import StatesEnum
+from lib.engines import EnginesEnum
 from lib.colors import ColorsEnum, char_to_int_color, get_oposing_color
-from lib.minimax.algo import minimax
-from lib.board.moves import get_possible_moves, get_active_moves
-from lib.board.move_algos import get_active_moves_path
-import copy
+from lib.minimax.algo import SearchContext, iterative_deepening, search_root, get_root_moves
+from lib.minimax.ponder import Ponderer
+from lib.minimax.ordering import MoveOrdering
+from lib.minimax.transposition import TranspositionTable
+from lib.minimax.resistance import ResistanceEvaluator
+from lib.minimax.eval_cache import CachedEvaluator, EvaluationCache
+from lib.minimax import eval as evaluation_module
+from lib.minimax import parallel, lazy_smp
+from lib.mcts.search import MonteCarloTreeSearch
+from lib.board.moves import Move
+from lib.board.bitboard import Bitboard, Tracking
 from lib.board.print_board import print_board
+from lib.book.opening import load_book
+from lib.solver.pns import ProofNumberSearch
+from lib.telemetry import SearchStats, TelemetryLog
+from lib.transport import MessageStream
 import os
-import datetime
-from concurrent.futures import ProcessPoolExecutor
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 
 class MinMaxAgent:
@@ -20,22 +35,62 @@ class MinMaxAgent:
 
     HOST = "127.0.0.1"
     PORT = 1234
-    SEARCH_DEPTH = 2
-    VERBOSE = False
+    MAX_SEARCH_DEPTH = 20
     TIMEOUT_SECONDS = 6
-    TIMEOUT_MOVE_SCORE = SEARCH_DEPTH + 3
+    GAME_SECONDS = 280
     SWAP_PROB = 0.85
+    TABLE_MEGABYTES = 32
+    TRACK_DISTANCES = True
+    ENGINE = EnginesEnum.SERIAL
+    PONDER = True
+    WORKERS = os.cpu_count()
+    MCTS_BATCH = 0
+    RESISTANCE_EVAL = False
+    VIRTUAL_CONNECTIONS = False
+    SOLVER_EMPTY_CELLS = 20
+    SOLVER_DISTANCE = 2
+    SOLVER_SHARE = 0.3
+    # One JSON line per move is appended here when set
+    TELEMETRY_PATH = None
+    # Leaf scores are kept across games in this SQLite file when set
+    EVAL_CACHE_PATH = None
+    EVAL_CACHE_ENTRIES = 200_000
+    BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening.book")
+
+    def __init__(self, resources=None):
+        """resources, if given, holds what a host shares between the
+        agents of all its matches (see arena/host.py): the agent of a
+        hosted game has its moves searched by the host's workers, and
+        each worker keeps one agent per configuration to search them.
+        """
+
+        self._resources = resources
 
     def run(self):
         """A finite-state machine that cycles through waiting for input
-        and sending moves.
+        and sending moves, on an asyncio event loop: searches run in a
+        worker thread while the loop keeps reading the socket.
         """
 
+        asyncio.run(self.play())
+
+    async def play(self):
+        'Plays one game on the running event loop, see run.'
+
         self._board_size = 0
-        self._board = []
+        self._board = None
         self._colour = ""
         self._turn_count = 1
         self._choices = []
+        self._time_used = 0
+        self._executor = None
+        self._book = None
+        self._eval_cache = None
+        self._telemetry = None
+        self._ponder_hit = None
+        self._search_executor = None
+        if self._resources is None:
+            self._search_executor = ThreadPoolExecutor(1)
 
         states = {
             StatesEnum.CONNECT: MinMaxAgent._connect,
@@ -45,33 +100,38 @@ class MinMaxAgent:
             StatesEnum.CLOSE: MinMaxAgent._close,
         }
 
-        res = states[1](self)
+        res = await states[1](self)
         while res != StatesEnum.END:
-            res = states[res](self)
+            res = await states[res](self)
 
-    def _connect(self):
+    async def _connect(self):
         """Connects to the socket and jumps to waiting for the start
         message.
         """
 
-        self._s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._s.connect((MinMaxAgent.HOST, MinMaxAgent.PORT))
+        self._stream = await MessageStream.connect(self.HOST, self.PORT)
 
         return StatesEnum.WAIT_START
 
-    def _wait_start(self):
+    async def _wait_start(self):
         """Initialises itself when receiving the start message, then
         answers if it is Red or waits if it is Blue.
         """
 
-        data = self._s.recv(1024).decode("utf-8").strip().split(";")
+        data = await self._stream.receive()
         if data[0] == "START":
             self._board_size = int(data[1])
-            for i in range(self._board_size):
-                new_row = []
-                for j in range(self._board_size):
-                    new_row.append(ColorsEnum.FREE)
-                self._board.append(new_row)
+            self._board = Bitboard(self._board_size)
+            if self._resources is None:
+                self._book = load_book(self.BOOK_PATH, self._board_size)
+            else:
+                self._book = self._resources.get_book(self._board_size)
+            if self.TELEMETRY_PATH:
+                self._telemetry = TelemetryLog(self.TELEMETRY_PATH)
+            self._ponderer = None
+            if self._resources is None:
+                self.setup_search()
+                self._tracking.apply(self._board)
             self._colour = data[2]
 
             if self._colour == "R":
@@ -83,107 +143,308 @@ class MinMaxAgent:
             print("ERROR: No START message received.")
             return 0
 
-    def _make_move(self):
+    def setup_search(self):
+        """Builds the table, the engine and the evaluator the searches use.
+        A host's workers call it once per configuration, with the table
+        and the caches of their resources (see arena/host.py).
+        """
+
+        # Every board that searches, in this process or a worker, carries
+        # the same trackers
+        self._tracking = Tracking(self.TRACK_DISTANCES, self.VIRTUAL_CONNECTIONS)
+        if self._resources is None:
+            self._table = TranspositionTable(self.TABLE_MEGABYTES)
+        else:
+            self._table = self._resources.table
+        self._ordering = MoveOrdering()
+        self._root_search = search_root
+        self._solver = ProofNumberSearch()
+        self._evaluator = None
+        if self.RESISTANCE_EVAL:
+            self._evaluator = ResistanceEvaluator()
+        if self.ENGINE == EnginesEnum.LAZY_SMP and self.WORKERS <= 1:
+            # No worker left for a helper search
+            self.ENGINE = EnginesEnum.SERIAL
+        if self.ENGINE == EnginesEnum.ROOT_PARALLEL:
+            worker_stop = multiprocessing.Event()
+            self._executor = ProcessPoolExecutor(
+                self.WORKERS,
+                initializer=parallel.init_worker,
+                initargs=(self.TABLE_MEGABYTES, self._evaluator,
+                          self._tracking, worker_stop),
+            )
+            self._root_search = parallel.ParallelRootSearch(
+                self._executor, self.WORKERS, worker_stop)
+        elif self.ENGINE == EnginesEnum.LAZY_SMP:
+            self._shared = lazy_smp.SharedTable(self.TABLE_MEGABYTES)
+            self._table = self._shared.table
+            self._executor = ProcessPoolExecutor(
+                self.WORKERS - 1,
+                initializer=lazy_smp.init_worker,
+                initargs=(self._shared.name, self.TABLE_MEGABYTES,
+                          self._evaluator, self._tracking),
+            )
+            self._lazy_smp = lazy_smp.LazySMPSearch(
+                self._executor, self._shared, self.WORKERS)
+        elif self.ENGINE == EnginesEnum.MCTS:
+            self._mcts = MonteCarloTreeSearch(batch=self.MCTS_BATCH)
+        if self.EVAL_CACHE_PATH and self.ENGINE != EnginesEnum.MCTS:
+            # Process pool workers above keep the plain evaluator
+            if self._resources is None:
+                self._eval_cache = EvaluationCache(
+                    self.EVAL_CACHE_PATH, self.EVAL_CACHE_ENTRIES)
+                cache = self._eval_cache
+            else:
+                cache = self._resources.get_eval_cache(
+                    self.EVAL_CACHE_PATH, self.EVAL_CACHE_ENTRIES)
+            self._evaluator = CachedEvaluator(
+                self._evaluator, cache, self.eval_cache_name())
+        # Root-parallel workers search with their own tables, which
+        # pondering in this process cannot fill
+        if self.PONDER and self.ENGINE not in (
+                EnginesEnum.MCTS, EnginesEnum.ROOT_PARALLEL):
+            self._ponderer = Ponderer(
+                self._table, self.MAX_SEARCH_DEPTH, self._evaluator,
+                self._tracking)
+
+    def eval_cache_name(self):
+        """Name of the leaf scores in the evaluation cache, which tells
+        apart every setting that changes them: the resistance evaluator,
+        or the distance one with its path algorithm and whether virtual
+        connections count.
+        """
+
+        if self.RESISTANCE_EVAL:
+            return "resistance"
+        name = f"distance:{evaluation_module.PATH_ALGORITHM.name}"
+        if self.VIRTUAL_CONNECTIONS:
+            name += ":virtual"
+        return name
+
+    async def _make_move(self):
         """Makes a random valid move. It will choose to swap with
         a coinflip.
         """
+        # No ponder search outlives the opponent's move, whatever it was
+        self.stop_pondering()
         swap = True
-        if self._turn_count == 2:
-            if self._board[0][0] != ColorsEnum.FREE:
+        if self._turn_count == 2 and self._book and self._board.red:
+            opening = self._board.moves_from_mask(self._board.red)[0]
+            swap = self._book.should_swap(opening)
+        elif self._turn_count == 2:
+            if self._board.get(0, 0) != ColorsEnum.FREE:
                 swap = False
-            elif self._board[len(self._board)-1][len(self._board)-1] != ColorsEnum.FREE:
+            elif self._board.get(self._board_size-1, self._board_size-1) != ColorsEnum.FREE:
                 swap = False
             elif choice(range(100)) <= 100 - 100*self.SWAP_PROB:
                 swap = False
 
+        record = {"size": self._board_size, "turn": self._turn_count, "colour": self._colour}
         if self._turn_count == 2 and swap:
             msg = "SWAP\n"
+            record["source"] = "swap"
         else:
-            start_of_move = datetime.datetime.now()
-            moves = get_active_moves_path(self._board)
-            # moves = get_active_moves(self._board)
-            # moves = []
-            best_score = float("-inf")
-            best_move = None
-            if not moves:
-                if self.VERBOSE:
-                    print("got all moves")
-                moves = get_possible_moves(self._board)
-
-            for move in moves:
-                updated_board = copy.deepcopy(self._board)
-                updated_board[move.i][move.j] = char_to_int_color(self._colour)
-                if self.VERBOSE:
-                    print(move.i, move.j)
-                score = minimax(
-                    updated_board,
-                    self.SEARCH_DEPTH,
-                    False,
-                    char_to_int_color(self._colour),
-                    float("-inf"),
-                    float("inf"),
-                )
-                if self.VERBOSE:
-                    print(score)
-
-                if datetime.datetime.now() - start_of_move > datetime.timedelta(seconds=self.TIMEOUT_SECONDS):
-                    break
-
-                if score == float("inf"):
-                    best_move = move
-                    self.SEARCH_DEPTH = 1
-                    break
-
-                elif score > best_score:
-                    best_move = move
-                    best_score = score
-
-                elif score > self.TIMEOUT_MOVE_SCORE:
-                    best_move = move
-                    best_score = score
-                    break
-
-            if not best_move:
-                best_move = move
-            self.TIMEOUT_MOVE_SCORE += 1
-            self._board[best_move.i][best_move.j] = char_to_int_color(
-                self._colour)
-            msg = f"{best_move.i},{best_move.j}\n"
-
-            if self.VERBOSE:
-                print(f"Sending message [{msg}]")
-
-        self._s.sendall(bytes(msg, "utf-8"))
+            # Search in the worker thread, or a host's worker process,
+            # stopping early if the game ends. Time spent queued behind
+            # other games' searches counts too.
+            if self._resources is None:
+                stop = threading.Event()
+                search = asyncio.get_running_loop().run_in_executor(
+                    self._search_executor, self.choose_move, record, stop,
+                    time.monotonic())
+            else:
+                stop = self._resources.stop
+                stop.clear()
+                search = asyncio.ensure_future(
+                    self.choose_hosted_move(record, time.monotonic()))
+            message = self._stream.next_message()
+            await asyncio.wait({search, message}, return_when=asyncio.FIRST_COMPLETED)
+            if message.done() and self.is_end(message.result()):
+                stop.set()
+                await search
+                return StatesEnum.CLOSE
+            msg = await search
+
+        await self._stream.send(msg)
+        if self._telemetry:
+            record.update(move=msg.strip(), ponder_hit=self._ponder_hit)
+            self._telemetry.write(record)
+            self._ponder_hit = None
+
+        if self._ponderer and msg != "SWAP\n":
+            self._ponderer.start(self._board, char_to_int_color(self._colour))
 
         return StatesEnum.WAIT_MESSAGE
 
-    def _wait_message(self):
+    def choose_move(self, record, stop, start_of_move):
+        """Runs in the search thread: picks the move, plays it on the
+        board and returns the message to send. Fills in the telemetry
+        record. Searches end early once stop is set.
+        """
+
+        record["queued"] = time.monotonic() - start_of_move
+        color = char_to_int_color(self._colour)
+        if self._resources is None:
+            self._table.new_search()
+        else:
+            # The host ages the table its games share
+            self._table.generation = self._resources.generation
+        self._ordering.new_search()
+        if self.ENGINE == EnginesEnum.ROOT_PARALLEL:
+            self._root_search.new_search()
+        book_move = self._book.get_move(self._board, color) if self._book else None
+        moves = [] if book_move else get_root_moves(self._board, color)
+
+        budget = self.move_budget()
+        deadline = start_of_move + budget
+        stats = SearchStats() if self.TELEMETRY_PATH else None
+        solved = None
+        if not book_move and self.should_solve(color):
+            solved = self._solver.solve(
+                self._board, color, start_of_move + self.SOLVER_SHARE * budget,
+                stop)
+        if book_move:
+            best_move = book_move
+            record["source"] = "book"
+        elif solved:
+            best_move = solved.move
+            record.update(source="solver", won=solved.won, nodes=solved.nodes)
+        elif self.ENGINE == EnginesEnum.MCTS:
+            best_move, best_score, playouts = self._mcts.search(
+                self._board, color, deadline, stop=stop)
+            record.update(source="mcts", score=best_score, playouts=playouts)
+        elif self.ENGINE == EnginesEnum.LAZY_SMP:
+            best_move, best_score, plies = self._lazy_smp.search(
+                self._board, moves, color, deadline, self.MAX_SEARCH_DEPTH,
+                self._ordering, self._evaluator, stats, stop)
+            record.update(source="minimax", score=best_score, depth=plies)
+        else:
+            context = SearchContext(
+                table=self._table, ordering=self._ordering,
+                evaluator=self._evaluator, stats=stats, stop=stop)
+            best_move, best_score, plies = iterative_deepening(
+                self._board,
+                moves,
+                color,
+                deadline,
+                self.MAX_SEARCH_DEPTH,
+                context,
+                self._root_search,
+            )
+            if stats is not None:
+                stats.nodes = context.nodes
+            record.update(source="minimax", score=best_score, depth=plies)
+
+        self._board.play(best_move, color)
+        seconds = time.monotonic() - start_of_move
+        self._time_used += seconds
+        msg = f"{best_move.i},{best_move.j}\n"
+        if stats is not None and record["source"] == "minimax":
+            record.update(dataclasses.asdict(stats))
+        record.update(seconds=seconds, budget=budget)
+        return msg
+
+    async def choose_hosted_move(self, record, start_of_move):
+        """choose_move for a hosted game: one of the host's worker
+        processes searches the position and sends back the message and
+        the record, then the move is played here.
+        """
+
+        msg, result = await self._resources.search(
+            self._board, self._colour, self._time_used, start_of_move)
+        record.update(result)
+        x, y = msg.strip().split(",")
+        self._board.play(Move(int(x), int(y)), char_to_int_color(self._colour))
+        self._time_used += record["seconds"]
+        return msg
+
+    def set_position(self, size, red, blue, colour, time_used):
+        """Run by a host's worker before choose_move: the game to search,
+        and the time its agent has used so far.
+        """
+
+        self._board_size = size
+        self._board = self._tracking.apply(Bitboard.from_masks(size, red, blue))
+        self._book = self._resources.get_book(size)
+        self._colour = colour
+        self._time_used = time_used
+
+    def should_solve(self, color):
+        """Whether the endgame solver may prove this position within the
+        move: few empty cells left, or we are close to connecting.
+        """
+
+        free_cells = bin(self._board.free()).count("1")
+        if free_cells <= self.SOLVER_EMPTY_CELLS:
+            return True
+        return self._board.connection_distance(color) <= self.SOLVER_DISTANCE
+
+    def move_budget(self):
+        """Seconds to spend on this move: what is left of the game clock
+        shared over the moves we may still have to play, never more than
+        TIMEOUT_SECONDS.
+        """
+
+        free_cells = bin(self._board.free()).count("1")
+        moves_left = max(free_cells // 2, 1)
+        remaining = max(self.GAME_SECONDS - self._time_used, 0)
+        return min(self.TIMEOUT_SECONDS, remaining / moves_left)
+
+    def is_end(self, data):
+        'Whether a message ends the game; an empty one means the server left.'
+
+        return data[0] in ("END", "") or data[-1] == "END"
+
+    async def _wait_message(self):
         """Waits for a new change message when it is not its turn."""
 
         self._turn_count += 1
 
-        data = self._s.recv(1024).decode("utf-8").strip().split(";")
-        if data[0] == "END" or data[-1] == "END":
+        data = await self._stream.receive()
+        if self.is_end(data):
             return StatesEnum.CLOSE
         else:
 
             if data[1] == "SWAP":
+                self.stop_pondering()
                 self._colour = self.opp_colour()
             else:
                 x, y = data[1].split(",")
-                if self._board[int(x)][int(y)] == ColorsEnum.FREE:
-                    self._board[int(x)][int(y)] = char_to_int_color(
-                        self.opp_colour())
+                if self._board.get(int(x), int(y)) == ColorsEnum.FREE:
+                    self.stop_pondering(Move(int(x), int(y)))
+                    self._board.play(
+                        Move(int(x), int(y)), char_to_int_color(self.opp_colour()))
 
             if data[-1] == self._colour:
                 return StatesEnum.MAKE_MOVE
 
         return StatesEnum.WAIT_MESSAGE
 
-    def _close(self):
+    def stop_pondering(self, move=None):
+        """Stops the background search once the opponent has moved."""
+
+        if self._ponderer:
+            hit = self._ponderer.stop(move)
+            if move:
+                self._ponder_hit = hit
+
+    async def _close(self):
         """Closes the socket."""
 
-        self._s.close()
+        self.stop_pondering()
+        await self._stream.close()
+        if self._resources is None:
+            self._search_executor.shutdown()
+            if self._book:
+                self._book.close()
+            if self._eval_cache:
+                self._eval_cache.close()
+        if self._telemetry:
+            self._telemetry.close()
+        if self._executor:
+            self._executor.shutdown(cancel_futures=True)
+        if self.ENGINE == EnginesEnum.LAZY_SMP:
+            self._shared.close()
         return StatesEnum.END
 
     def opp_colour(self):
@@ -0,0 +1,296 @@
+"""Serves many games from one long-lived agent host.
+
+    python -m arena.host --port 1300 --workers 2 TIMEOUT_SECONDS=1
+
+Each line "PLAY;port" or "PLAY;port;KEY=VALUE,..." sent to --port starts
+a MinMaxAgent that connects to the game server on that port, with the
+host's settings and then the line's applied. The host answers "OK" once
+the game is started, or "ERROR;reason". Games are tasks on one event
+loop, each with its own state machine, so a game that ends or fails does
+not touch the others.
+
+Moves are searched by a pool of worker processes, one move per worker,
+first come first served, so the games use as many cores as there are
+workers. Each worker keeps an agent per configuration that searches the
+positions it is sent. Every search stops at its own deadline, so a game
+waits at most for the searches queued ahead of it, and that wait is
+charged to its clock.
+
+The games share what is read-mostly or keyed by position: one
+transposition table per configuration (games with different settings
+score positions differently) in shared memory that every worker attaches
+to, the opening books, which each process maps from the same file, and
+in each worker one evaluation cache per EVAL_CACHE_PATH. Searches of
+several games run on a table at once, so no game ages it: the host moves
+it to a new generation every GENERATION_SECONDS instead.
+
+Hosted games cannot ponder, nor use the ROOT_PARALLEL or LAZY_SMP
+engines, which need process pools of their own.
+"""
+import argparse
+import asyncio
+import dataclasses
+import socket
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+from Agent import MinMaxAgent
+from arena.player import configure, parse_settings
+from lib.book.opening import load_book
+from lib.engines import EnginesEnum
+from lib.minimax.eval_cache import EvaluationCache
+from lib.minimax.lazy_smp import SharedTable
+from lib.minimax.transposition import TranspositionTable
+from lib.transport import MessageStream
+
+# Settings every hosted game starts from, before the host's own
+DEFAULT_SETTINGS = ["PONDER=False"]
+# Games served at once, one stop flag each
+MAX_GAMES = 1024
+# Table entries older than this are replaced first. The generation wraps
+# after 63 of them, when entries that old have long been overwritten.
+GENERATION_SECONDS = 10
+
+
+def get_generation():
+    'Generation of the hosted tables at this time, from 1 to 63.'
+    return int(time.monotonic() // GENERATION_SECONDS) % 63 + 1
+
+
+class StopFlag:
+    """The stop flag of one game, a byte of shared memory that the game
+    sets and the worker searching its move polls, with the methods of a
+    threading.Event that the searches use.
+    """
+
+    def __init__(self, buffer, index):
+        self.buffer = buffer
+        self.index = index
+
+    def is_set(self):
+        return self.buffer[self.index] == 1
+
+    def set(self):
+        self.buffer[self.index] = 1
+
+    def clear(self):
+        self.buffer[self.index] = 0
+
+
+@dataclasses.dataclass
+class SharedResources:
+    'What the host gives the MinMaxAgent of one game.'
+    host: "AgentHost"
+    settings: tuple
+    table: SharedTable
+    stop: StopFlag
+
+    def get_book(self, size):
+        return self.host.get_book(size)
+
+    async def search(self, board, colour, time_used, start_of_move):
+        """The message and the telemetry record of the move a worker
+        chooses in the position.
+        """
+        future = self.host.search_executor.submit(
+            search_move, self.settings, self.table.name, self.stop.index,
+            board.size, board.red, board.blue, colour, time_used,
+            start_of_move, get_generation())
+        return await asyncio.wrap_future(future)
+
+
+@dataclasses.dataclass
+class WorkerResources:
+    'What a worker gives the MinMaxAgent of one configuration.'
+    table: TranspositionTable
+    generation: int = 1
+
+    def get_book(self, size):
+        if size not in worker_books:
+            worker_books[size] = load_book(worker_book_path, size)
+        return worker_books[size]
+
+    def get_eval_cache(self, path, max_entries):
+        if path not in worker_eval_caches:
+            worker_eval_caches[path] = EvaluationCache(path, max_entries)
+        return worker_eval_caches[path]
+
+
+def init_worker(table_megabytes, book_path, stops_name):
+    global worker_table_megabytes, worker_book_path, worker_stops
+    global worker_tables, worker_agents, worker_books, worker_eval_caches
+    worker_table_megabytes = table_megabytes
+    worker_book_path = book_path
+    worker_stops = shared_memory.SharedMemory(stops_name)
+    worker_tables = {}
+    worker_agents = {}
+    worker_books = {}
+    worker_eval_caches = {}
+    # Flushes the evaluation caches when the pool shuts the worker down
+    util.Finalize(None, close_worker, exitpriority=10)
+
+
+def close_worker():
+    for cache in worker_eval_caches.values():
+        cache.close()
+    for book in worker_books.values():
+        if book:
+            book.close()
+    for shared in worker_tables.values():
+        shared.close()
+    worker_stops.close()
+
+
+def get_worker_agent(settings, table_name):
+    'The agent of a configuration in this worker, made on first use.'
+    if settings not in worker_agents:
+        if table_name not in worker_tables:
+            worker_tables[table_name] = SharedTable(worker_table_megabytes, table_name)
+        resources = WorkerResources(worker_tables[table_name].table)
+        agent = configure(MinMaxAgent(resources), settings)
+        agent.setup_search()
+        worker_agents[settings] = agent, resources
+    return worker_agents[settings]
+
+
+def search_move(settings, table_name, stop_index, size, red, blue, colour,
+                time_used, start_of_move, generation):
+    """Runs in a pool worker: chooses the move of a hosted game, which
+    stops early once the game's stop flag is set. Returns the message to
+    send and the telemetry record.
+    """
+    agent, resources = get_worker_agent(settings, table_name)
+    resources.generation = generation
+    agent.set_position(size, red, blue, colour, time_used)
+    record = {}
+    msg = agent.choose_move(record, StopFlag(worker_stops.buf, stop_index), start_of_move)
+    return msg, record
+
+
+class AgentHost:
+    def __init__(self, settings=(), workers=1,
+                 table_megabytes=MinMaxAgent.TABLE_MEGABYTES,
+                 book_path=MinMaxAgent.BOOK_PATH):
+        self.settings = DEFAULT_SETTINGS + list(settings)
+        self.table_megabytes = table_megabytes
+        self.book_path = book_path
+        self.stops = shared_memory.SharedMemory(create=True, size=MAX_GAMES)
+        self.free_stops = list(range(MAX_GAMES))
+        self.search_executor = ProcessPoolExecutor(
+            workers,
+            initializer=init_worker,
+            initargs=(table_megabytes, book_path, self.stops.name),
+        )
+        self.tables = {}
+        self.books = {}
+        self.games = set()
+        self.played = 0
+
+    def get_book(self, size):
+        if size not in self.books:
+            self.books[size] = load_book(self.book_path, size)
+        return self.books[size]
+
+    def get_resources(self, settings):
+        key = tuple(sorted(settings))
+        if key not in self.tables:
+            self.tables[key] = SharedTable(self.table_megabytes)
+        if not self.free_stops:
+            raise ValueError(f"already serving {MAX_GAMES} games")
+        stop = StopFlag(self.stops.buf, self.free_stops.pop())
+        return SharedResources(self, key, self.tables[key], stop)
+
+    def start_game(self, port, settings=()):
+        settings = self.settings + list(settings)
+        # Checked before the game takes a stop flag
+        agent = configure(MinMaxAgent(), settings)
+        if agent.ENGINE in (EnginesEnum.ROOT_PARALLEL, EnginesEnum.LAZY_SMP):
+            raise ValueError(f"hosted games cannot use ENGINE={agent.ENGINE.name}")
+        if agent.PONDER:
+            raise ValueError("hosted games cannot ponder")
+        resources = self.get_resources(settings)
+        agent = configure(MinMaxAgent(resources), settings)
+        agent.PORT = port
+        task = asyncio.ensure_future(self.play(agent, resources))
+        self.games.add(task)
+        task.add_done_callback(self.games.discard)
+
+    async def play(self, agent, resources):
+        try:
+            await agent.play()
+        except Exception:
+            # One broken game must not take the others down
+            traceback.print_exc()
+        self.free_stops.append(resources.stop.index)
+        self.played += 1
+
+    def command(self, data):
+        if data[0] != "PLAY" or len(data) not in (2, 3):
+            return "ERROR;expected PLAY;port[;settings]\n"
+        try:
+            self.start_game(int(data[1]), parse_settings(data[2]) if len(data) == 3 else [])
+        except ValueError as error:
+            return f"ERROR;{error}\n"
+        return "OK\n"
+
+    async def handle(self, reader, writer):
+        stream = MessageStream(reader, writer)
+        while True:
+            data = await stream.receive()
+            if data == [""]:
+                break
+            await stream.send(self.command(data))
+        await stream.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"listening on port {server.sockets[0].getsockname()[1]}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        self.search_executor.shutdown(cancel_futures=True)
+        for book in self.books.values():
+            if book:
+                book.close()
+        for shared in self.tables.values():
+            shared.close()
+        self.stops.close()
+        self.stops.unlink()
+
+
+def request_game(address, port, settings=()):
+    """Asks the host at address to play the game served on port; the
+    launch function a Referee takes in place of a player command.
+    """
+    line = f"PLAY;{port};{','.join(settings)}" if settings else f"PLAY;{port}"
+    with socket.create_connection(address) as connection:
+        connection.sendall(f"{line}\n".encode("utf-8"))
+        reply = connection.makefile("r", encoding="utf-8").readline().strip()
+    if reply != "OK":
+        raise RuntimeError(f"host refused the game: {reply}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1300, help="0 for any free port")
+    parser.add_argument("--workers", type=int, default=1, help="searches at once, one process each")
+    parser.add_argument("--table-megabytes", type=int, default=MinMaxAgent.TABLE_MEGABYTES)
+    parser.add_argument("settings", nargs="*")
+    args = parser.parse_args()
+
+    host = AgentHost(args.settings, args.workers, args.table_megabytes)
+    try:
+        asyncio.run(host.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"served {host.played} games", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
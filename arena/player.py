@@ -0,0 +1,50 @@
+"""Runs one MinMaxAgent with its settings overridden.
+
+    python -m arena.player --port 1234 ENGINE=MCTS TIMEOUT_SECONDS=1
+"""
+import argparse
+import ast
+import enum
+from Agent import MinMaxAgent
+
+
+def parse_settings(text):
+    'Settings written as "KEY=VALUE,KEY=VALUE" as a list of "KEY=VALUE".'
+    return [setting for setting in text.split(",") if setting]
+
+
+def configure(agent, settings):
+    """Sets agent attributes from "KEY=VALUE" strings. Values are Python
+    literals, or member names for enum settings such as ENGINE=MCTS.
+    """
+    for setting in settings:
+        key, text = setting.split("=", 1)
+        if not hasattr(MinMaxAgent, key):
+            raise ValueError(f"MinMaxAgent has no setting {key}")
+        current = getattr(MinMaxAgent, key)
+        if isinstance(current, enum.Enum) and text in type(current).__members__:
+            value = type(current)[text]
+        else:
+            try:
+                value = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                value = text
+        setattr(agent, key, value)
+    return agent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=MinMaxAgent.HOST)
+    parser.add_argument("--port", type=int, default=MinMaxAgent.PORT)
+    parser.add_argument("settings", nargs="*")
+    args = parser.parse_args()
+
+    agent = configure(MinMaxAgent(), args.settings)
+    agent.HOST = args.host
+    agent.PORT = args.port
+    agent.run()
+
+
+if __name__ == "__main__":
+    main()
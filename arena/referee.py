@@ -0,0 +1,186 @@
+"""Local stand-in for the game server.
+
+Speaks the protocol MinMaxAgent expects: START;size;colour to each
+player, then CHANGE;move;board;colour to move after every move (SWAP as
+the move after a swap), and END;winner once someone connects. Players
+answer with "i,j" or, on the second move of the game only, "SWAP".
+After a swap the players exchange colours and the stone stays where it
+is, so the first player moves again, now as Blue.
+"""
+import dataclasses
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import List
+from lib.board.bitboard import Bitboard
+from lib.board.moves import Move
+from lib.colors import ColorsEnum, char_to_int_color, int_color_to_char
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Seconds a player process gets to start and connect
+CONNECT_SECONDS = 30
+# Seconds a player process gets to exit after the game
+EXIT_SECONDS = 10
+
+
+class PlayerLost(Exception):
+    'The player to move forfeits, for the reason given.'
+
+
+@dataclasses.dataclass
+class GameResult:
+    """Players are numbered 0 (Red at the start) and 1. moves lists
+    (player, colour, move, seconds) for every move, SWAP included.
+    """
+    winner: int
+    reason: str
+    swapped: bool
+    moves: List[tuple]
+
+
+class Player:
+    def __init__(self, command, server, game_seconds, stderr):
+        port = server.getsockname()[1]
+        if callable(command):
+            # The agent lives elsewhere, such as in an arena.host
+            command(port)
+            self.process = None
+        else:
+            self.process = subprocess.Popen(
+                command + [f"--port={port}"],
+                cwd=ROOT, stdout=subprocess.DEVNULL, stderr=stderr)
+        server.settimeout(CONNECT_SECONDS)
+        self.connection, _ = server.accept()
+        self.reader = self.connection.makefile("r", encoding="utf-8")
+        self.clock = game_seconds
+
+    def send(self, message):
+        try:
+            self.connection.sendall(f"{message}\n".encode("utf-8"))
+        except OSError:
+            pass
+
+    def receive(self, move_seconds):
+        'The next line the player sends, timed against its game clock.'
+        limit = self.clock if move_seconds is None else min(self.clock, move_seconds)
+        self.connection.settimeout(max(limit, 0.001))
+        start = time.monotonic()
+        try:
+            line = self.reader.readline()
+        except socket.timeout:
+            raise PlayerLost("timeout")
+        except OSError:
+            raise PlayerLost("disconnected")
+        seconds = time.monotonic() - start
+        self.clock -= seconds
+        if not line:
+            raise PlayerLost("disconnected")
+        return line.strip(), seconds
+
+    def close(self):
+        self.reader.close()
+        self.connection.close()
+        if self.process is None:
+            return
+        try:
+            self.process.wait(EXIT_SECONDS)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class Referee:
+    """Plays one game between two player commands (argument lists that
+    start an agent; the referee appends --port=N), or functions that get
+    an agent elsewhere to connect to a port. Each player has
+    game_seconds on its clock and, if set, at most move_seconds per move.
+    """
+
+    def __init__(self, size=11, game_seconds=300, move_seconds=None,
+                 stderr=subprocess.DEVNULL):
+        self.size = size
+        self.game_seconds = game_seconds
+        self.move_seconds = move_seconds
+        self.stderr = stderr
+
+    def board_text(self, board):
+        return ",".join(
+            "".join(int_color_to_char(color) for color in row) for row in board)
+
+    def play(self, first_command, second_command):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(2)
+        players = []
+        try:
+            for command in (first_command, second_command):
+                players.append(
+                    Player(command, server, self.game_seconds, self.stderr))
+            return self.run(players)
+        finally:
+            server.close()
+            for player in players:
+                player.close()
+
+    def run(self, players):
+        board = Bitboard(self.size)
+        board.track_connections()
+        # Index of the player holding each colour
+        colours = {"R": 0, "B": 1}
+        players[0].send(f"START;{self.size};R")
+        players[1].send(f"START;{self.size};B")
+
+        moves = []
+        swapped = False
+        turn = "R"
+        while True:
+            mover = colours[turn]
+            try:
+                message, seconds = players[mover].receive(self.move_seconds)
+                moves.append((mover, turn, message, seconds))
+                if message == "SWAP":
+                    if len(moves) != 2:
+                        raise PlayerLost("illegal swap")
+                    swapped = True
+                    colours = {"R": colours["B"], "B": colours["R"]}
+                    turn = "B"
+                    for player in players:
+                        player.send(f"CHANGE;SWAP;{self.board_text(board)};{turn}")
+                    continue
+                move = self.parse_move(board, message)
+            except PlayerLost as lost:
+                winner = 1 - mover
+                self.end(players, colours, winner)
+                return GameResult(winner, str(lost), swapped, moves)
+
+            board.play(move, char_to_int_color(turn))
+            if board.winner() != ColorsEnum.FREE:
+                self.end(players, colours, mover)
+                return GameResult(mover, "connected", swapped, moves)
+            turn = "B" if turn == "R" else "R"
+            for player in players:
+                player.send(f"CHANGE;{message};{self.board_text(board)};{turn}")
+
+    def parse_move(self, board, message):
+        try:
+            i, j = (int(part) for part in message.split(","))
+        except ValueError:
+            raise PlayerLost(f"bad message {message!r}")
+        if not (0 <= i < self.size and 0 <= j < self.size):
+            raise PlayerLost(f"off the board {message}")
+        move = Move(i, j)
+        if not board.is_free(move):
+            raise PlayerLost(f"occupied {message}")
+        return move
+
+    def end(self, players, colours, winner):
+        colour = "R" if colours["R"] == winner else "B"
+        for player in players:
+            player.send(f"END;{colour}")
+
+
+def get_agent_command(settings=()):
+    'Command that starts a MinMaxAgent with "KEY=VALUE" setting overrides.'
+    return [sys.executable, "-m", "arena.player", *settings]
@@ -0,0 +1,171 @@
+"""Plays many games between two agent configurations in parallel.
+
+    python -m arena.run --games 200 --size 11 \\
+        -a TIMEOUT_SECONDS=1 -b TIMEOUT_SECONDS=1,ENGINE=MCTS
+
+Each game runs its own referee on an ephemeral port. With --host-workers
+both players of every game are served by one arena.host process instead
+of two agent processes per game, so games share its caches. The players
+alternate colours. Every game is appended to --output as a JSON line,
+with the time of every move, and the summary (win rate and Elo of A
+against B, with 95% confidence intervals) is printed as JSON at the end.
+"""
+import argparse
+import json
+import math
+import os
+import signal
+import statistics
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from arena.host import request_game
+from arena.player import parse_settings
+from arena.referee import ROOT, Referee, get_agent_command
+
+NAMES = ("A", "B")
+# Normal quantile of the 95% confidence intervals
+Z = 1.96
+
+
+def play_game(number, settings, size, game_seconds, move_seconds, host=None):
+    """Runs in a pool worker. A is Red in even games, B in odd ones;
+    returns the game record. Players come from the arena.host at the
+    address host if given.
+    """
+    order = (0, 1) if number % 2 == 0 else (1, 0)
+    referee = Referee(size, game_seconds, move_seconds)
+    if host:
+        players = (partial(request_game, host, settings=settings[index]) for index in order)
+    else:
+        players = (get_agent_command(settings[index]) for index in order)
+    result = referee.play(*players)
+    return {
+        "game": number,
+        "red": NAMES[order[0]],
+        "winner": NAMES[order[result.winner]],
+        "reason": result.reason,
+        "swapped": result.swapped,
+        "moves": [
+            {"player": NAMES[order[player]], "colour": colour, "move": move,
+             "seconds": seconds}
+            for player, colour, move, seconds in result.moves
+        ],
+    }
+
+
+def wilson_interval(wins, games):
+    'Wilson score interval of a win rate.'
+    if games == 0:
+        return 0.0, 1.0
+    rate = wins / games
+    centre = (rate + Z * Z / (2 * games)) / (1 + Z * Z / games)
+    spread = Z / (1 + Z * Z / games) * math.sqrt(
+        rate * (1 - rate) / games + Z * Z / (4 * games * games))
+    return centre - spread, centre + spread
+
+
+def elo(rate, games):
+    """Elo difference of a win rate. Clamped half a game away from 0 and
+    1, where the difference is infinite.
+    """
+    margin = 0.5 / max(games, 1)
+    rate = min(max(rate, margin), 1 - margin)
+    return -400 * math.log10(1 / rate - 1)
+
+
+def summarize(records):
+    games = len(records)
+    wins = sum(record["winner"] == "A" for record in records)
+    rate = wins / games if games else 0.5
+    low, high = wilson_interval(wins, games)
+    summary = {
+        "games": games,
+        "a_wins": wins,
+        "a_win_rate": rate,
+        "a_win_rate_interval": [low, high],
+        "elo": elo(rate, games),
+        "elo_interval": [elo(low, games), elo(high, games)],
+        "reasons": {},
+    }
+    for name in NAMES:
+        as_red = [record for record in records if record["red"] == name]
+        summary[f"{name.lower()}_red_win_rate"] = (
+            sum(record["winner"] == name for record in as_red) / len(as_red)
+            if as_red else None)
+        seconds = [
+            move["seconds"] for record in records for move in record["moves"]
+            if move["player"] == name
+        ]
+        summary[f"{name.lower()}_move_seconds"] = {
+            "mean": statistics.mean(seconds) if seconds else None,
+            "max": max(seconds) if seconds else None,
+        }
+    for record in records:
+        summary["reasons"][record["reason"]] = summary["reasons"].get(record["reason"], 0) + 1
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-a", default="", help="settings of A, KEY=VALUE,...")
+    parser.add_argument("-b", default="", help="settings of B, KEY=VALUE,...")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--size", type=int, default=11)
+    parser.add_argument("--game-seconds", type=float, default=300)
+    parser.add_argument("--move-seconds", type=float)
+    parser.add_argument(
+        "--workers", type=int, default=max(os.cpu_count() // 2, 1),
+        help="games at once; each runs two agent processes")
+    parser.add_argument(
+        "--host-workers", type=int,
+        help="serve every player from one arena.host with this many search workers")
+    parser.add_argument("--output", default="arena.jsonl")
+    args = parser.parse_args()
+
+    settings = (parse_settings(args.a), parse_settings(args.b))
+    records = []
+    host = None
+    if args.host_workers:
+        host = start_host(args.host_workers)
+    try:
+        run_games(args, settings, records, host and ("127.0.0.1", host.port))
+    finally:
+        if host:
+            # Interrupted, the host flushes its evaluation caches
+            host.send_signal(signal.SIGINT)
+            host.wait()
+
+    print(json.dumps(summarize(records), indent=2))
+
+
+def start_host(workers):
+    'Starts an arena.host on a free port, noted as its port attribute.'
+    host = subprocess.Popen(
+        [sys.executable, "-m", "arena.host", "--port=0", f"--workers={workers}"],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    host.port = int(host.stdout.readline().split()[-1])
+    return host
+
+
+def run_games(args, settings, records, host):
+    with ProcessPoolExecutor(args.workers) as executor, open(args.output, "a") as output:
+        futures = [
+            executor.submit(
+                play_game, number, settings, args.size, args.game_seconds,
+                args.move_seconds, host)
+            for number in range(args.games)
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            record["settings"] = {"A": args.a, "B": args.b}
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            records.append(record)
+            wins = sum(record["winner"] == "A" for record in records)
+            print(f"{len(records)}/{args.games} games, A won {wins}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import dataclasses
+import random
+from lib.board.bitboard import Bitboard
+from lib.colors import ColorsEnum, get_oposing_color
+
+SIZES = (7, 11, 13, 19)
+# Share of the cells holding a stone: opening, middle game, late middle game
+FILLS = (0.1, 0.25, 0.4)
+POSITIONS_PER_FILL = 3
+
+
+@dataclasses.dataclass
+class Position:
+    name: str
+    board: Bitboard
+    # Colour to move
+    color: ColorsEnum
+
+
+def random_position(size, stones, seed):
+    """Plays stones random alternating moves from the empty board, never
+    one that ends the game. The same seed always gives the same position.
+    """
+    generator = random.Random(seed)
+    board = Bitboard(size)
+    board.track_connections()
+    color = ColorsEnum.RED
+    cells = list(range(size * size))
+    generator.shuffle(cells)
+    for cell in cells:
+        if stones == 0:
+            break
+        board.play(board.move_at(cell), color)
+        if board.winner() != ColorsEnum.FREE:
+            board.undo()
+            continue
+        color = get_oposing_color(color)
+        stones -= 1
+    board.history = []
+    return board, color
+
+
+def get_corpus(size):
+    'The fixed benchmark positions of one board size.'
+    positions = []
+    for fill in FILLS:
+        stones = int(size * size * fill)
+        for number in range(POSITIONS_PER_FILL):
+            name = f"{size}x{size}-{stones}-{number}"
+            board, color = random_position(size, stones, name)
+            positions.append(Position(name, board, color))
+    return positions
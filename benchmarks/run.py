@@ -0,0 +1,208 @@
+"""Benchmarks of the search and evaluation hot paths.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --sizes 7 11 --compare results.json
+
+Every benchmark runs on the same seeded positions (see corpus.py) and
+the results are written as JSON, one record per benchmark, board size
+and position, plus the median of each benchmark and size.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from benchmarks.corpus import SIZES, get_corpus
+from lib.board.array_graph import ArrayGraph
+from lib.board.graph import Graph
+from lib.board.move_algos import get_active_moves_path
+from lib.board.sides import get_sides_for_color
+from lib.minimax import eval as evaluation_module
+from lib.minimax.algo import SearchContext, SearchTimeout, get_root_moves, search_root
+from lib.minimax.eval import evaluation
+from lib.minimax.ordering import MoveOrdering
+from lib.minimax.transposition import TranspositionTable
+
+FORMAT_VERSION = 1
+
+
+def calls_per_second(function, seconds, repeats=3):
+    """Calls function repeatedly for at least the given time, repeats
+    times, and keeps the best rate: slower runs measure other load on the
+    machine, not the code.
+    """
+    best = 0
+    for _ in range(repeats):
+        calls = 0
+        batch = 1
+        start = time.perf_counter()
+        while True:
+            for _ in range(batch):
+                function()
+            calls += batch
+            elapsed = time.perf_counter() - start
+            if elapsed >= seconds:
+                break
+            batch *= 2
+        best = max(best, calls / elapsed)
+    return best
+
+
+def path_search(graph_class, method, board, color):
+    """One shortest path search between the colour's sides, graph set up
+    included, as get_graph_score runs it.
+    """
+    def search():
+        graph = graph_class(board, color)
+        sides = get_sides_for_color(color)
+        getattr(graph, method)(graph.sides[sides[1]], graph.sides[sides[0]])
+    return search
+
+
+def get_rate_benchmarks(position):
+    board = position.board
+    color = position.color
+    benchmarks = {
+        "evaluation": lambda: evaluation(board, color),
+        "get_active_moves_path": lambda: get_active_moves_path(board),
+        "bitboard.connection_distance": lambda: board.connection_distance(color),
+    }
+    for graph_class in (Graph, ArrayGraph):
+        for method in ("make_shortest_path", "make_shortest_path_01bfs", "make_shortest_path_astar"):
+            name = f"{graph_class.__name__}.{method}"
+            benchmarks[name] = path_search(graph_class, method, board, color)
+    return benchmarks
+
+
+def time_to_depth(position, max_depth, seconds):
+    """Runs the iterations of iterative deepening one by one and records
+    the cumulative time and nodes when each depth completes.
+    """
+    board = position.board
+    moves = get_root_moves(board, position.color)
+    context = SearchContext(
+        table=TranspositionTable(32), ordering=MoveOrdering(),
+        deadline=time.monotonic() + seconds)
+    depths = []
+    start = time.perf_counter()
+    for depth in range(max_depth):
+        try:
+            search_root(board, moves, depth, position.color, context)
+        except SearchTimeout:
+            while board.history:
+                board.undo()
+            break
+        depths.append({
+            "depth": depth + 1,
+            "seconds": time.perf_counter() - start,
+            "nodes": context.nodes,
+        })
+    elapsed = time.perf_counter() - start
+    return {
+        "nodes": context.nodes,
+        "nodes_per_second": context.nodes / elapsed if elapsed else 0,
+        "time_to_depth": depths,
+    }
+
+
+def run(sizes, seconds, repeats, max_depth, search_seconds, log=print):
+    records = []
+    for size in sizes:
+        for position in get_corpus(size):
+            for name, function in get_rate_benchmarks(position).items():
+                records.append({
+                    "benchmark": name,
+                    "size": size,
+                    "position": position.name,
+                    "calls_per_second": calls_per_second(function, seconds, repeats),
+                })
+            records.append({
+                "benchmark": "minimax",
+                "size": size,
+                "position": position.name,
+                **time_to_depth(position, max_depth, search_seconds),
+            })
+            log(f"{position.name} done")
+    return records
+
+
+def summarize(records):
+    'Median rate of each benchmark and board size, keyed "benchmark/size".'
+    rates = {}
+    for record in records:
+        rate = record.get("calls_per_second", record.get("nodes_per_second"))
+        rates.setdefault(f"{record['benchmark']}/{record['size']}", []).append(rate)
+    return {key: statistics.median(values) for key, values in sorted(rates.items())}
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(summary, baseline, tolerance):
+    """Benchmarks whose median rate fell by more than tolerance (a
+    fraction) against the baseline summary, as (key, old, new).
+    """
+    return [
+        (key, baseline[key], rate)
+        for key, rate in summary.items()
+        if key in baseline and rate < baseline[key] * (1 - tolerance)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument(
+        "--seconds", type=float, default=0.2, help="time per rate measurement")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-depth", type=int, default=4)
+    parser.add_argument(
+        "--search-seconds", type=float, default=2, help="minimax time per position")
+    parser.add_argument("--output", help="JSON file for the results, default stdout")
+    parser.add_argument("--compare", help="earlier results to check for regressions")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.15,
+        help="slow down that counts as a regression, as a fraction")
+    args = parser.parse_args()
+
+    log = lambda message: print(message, file=sys.stderr)
+    records = run(
+        args.sizes, args.seconds, args.repeats, args.max_depth, args.search_seconds, log)
+    summary = summarize(records)
+    results = {
+        "version": FORMAT_VERSION,
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "path_algorithm": evaluation_module.PATH_ALGORITHM.name,
+        "settings": vars(args),
+        "summary": summary,
+        "records": records,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["summary"]
+        regressions = compare(summary, baseline, args.tolerance)
+        for key, old, new in regressions:
+            log(f"REGRESSION {key}: {old:.1f} -> {new:.1f} per second")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Lets the tests import lib and Agent from the repository root.
@@ -0,0 +1,206 @@
+import itertools
+from array import array
+from collections import deque
+from heapq import heappop, heappush
+from lib.board.hex import Hex
+from lib.board.moves import Move
+from lib.board.neighbours import get_neighbour_table
+from lib.board.sides import SidesEnum, get_color_for_side
+from lib.colors import ColorsEnum, get_oposing_color
+
+INFINITY = float("inf")
+NO_NODE = -1
+
+
+class ArrayGraph:
+    """Same searches as Graph, but over flat buffers indexed by node id
+    (see NeighbourTable): colours in a bytearray, distances and
+    predecessors in arrays. Hex and Move objects are only built for the
+    four sides and for what a method returns.
+    """
+
+    def __init__(self, board, player_color):
+        self.board_size = len(board)
+        self.table = get_neighbour_table(self.board_size)
+        cells = self.table.cells
+        self.colors = bytearray(len(self.table.neighbours))
+        if hasattr(board, "red"):
+            for cell in range(cells):
+                if board.red >> cell & 1:
+                    self.colors[cell] = ColorsEnum.RED
+                elif board.blue >> cell & 1:
+                    self.colors[cell] = ColorsEnum.BLUE
+        else:
+            for i in range(self.board_size):
+                for j in range(self.board_size):
+                    self.colors[i * self.board_size + j] = board[i][j]
+
+        for side in SidesEnum:
+            self.colors[self.table.side_id(side)] = get_color_for_side(side)
+        self.sides = {
+            SidesEnum.TOP: Hex(Move(-1, 0), get_color_for_side(SidesEnum.TOP), side=SidesEnum.TOP),
+            SidesEnum.BOTTOM: Hex(Move(self.board_size, 0), get_color_for_side(SidesEnum.BOTTOM), side=SidesEnum.BOTTOM),
+            SidesEnum.LEFT: Hex(Move(0, -1), get_color_for_side(SidesEnum.LEFT), side=SidesEnum.LEFT),
+            SidesEnum.RIGHT: Hex(Move(0, self.board_size), get_color_for_side(SidesEnum.RIGHT), side=SidesEnum.RIGHT),
+        }
+
+        self.distances = array("d", [INFINITY]) * len(self.colors)
+        self.predecessors = array("i", [NO_NODE]) * len(self.colors)
+        self.set_player_color(player_color)
+
+    def set_player_color(self, player_color):
+        self.player_color = player_color
+        self.opponenet_color = get_oposing_color(player_color)
+
+    def clear_graph(self):
+        self.distances = array("d", [INFINITY]) * len(self.colors)
+        self.predecessors = array("i", [NO_NODE]) * len(self.colors)
+
+    def get_node_id(self, piece: Hex):
+        if piece.side:
+            return self.table.side_id(piece.side)
+        return piece.move.i * self.board_size + piece.move.j
+
+    def get_piece(self, node):
+        'Builds the Hex of a node id.'
+        if node >= self.table.cells:
+            return self.sides[SidesEnum(node - self.table.cells + 1)]
+        i, j = divmod(node, self.board_size)
+        return Hex(Move(i, j), ColorsEnum(self.colors[node]))
+
+    def get_neighbours(self, piece: Hex):
+        return [
+            self.get_piece(node)
+            for node in self.table.neighbours[self.get_node_id(piece)]
+        ]
+
+    def get_piece_path_length(self, piece):
+        return self.distances[self.get_node_id(piece)]
+
+    def get_path(self, end_id):
+        path = []
+        node = end_id
+        while node != NO_NODE:
+            path.append(self.get_piece(node))
+            node = self.predecessors[node]
+        return path[::-1]
+
+    def weight(self, node, end_id):
+        """Cost of entering a node: 0 for own stones and the end side, 1
+        for free cells, None if it cannot be entered.
+        """
+        if node >= self.table.cells:
+            return 0 if node == end_id else None
+        color = self.colors[node]
+        if color == self.player_color:
+            return 0
+        if color == ColorsEnum.FREE:
+            return 1
+        return None
+
+    def make_shortest_path(self, start, end):
+        """Dijkstra from one side to another. Fills distances and
+        predecessors for every node it settles; the path length is then
+        get_piece_path_length(end).
+        """
+        self.clear_graph()
+        neighbours = self.table.neighbours
+        distances = self.distances
+        predecessors = self.predecessors
+        start_id = self.get_node_id(start)
+        end_id = self.get_node_id(end)
+        distances[start_id] = 0
+        pending = [(0, start_id)]
+        while pending:
+            distance, current = heappop(pending)
+            if distance > distances[current]:
+                continue
+            if current == end_id:
+                return
+            for neighbour in neighbours[current]:
+                weight = self.weight(neighbour, end_id)
+                if weight is None:
+                    continue
+                if distance + weight < distances[neighbour]:
+                    distances[neighbour] = distance + weight
+                    predecessors[neighbour] = current
+                    heappush(pending, (distance + weight, neighbour))
+
+    def make_shortest_path_01bfs(self, start, end):
+        """Exact connection distance between two sides, with a deque as in
+        Graph.make_shortest_path_01bfs.
+        """
+        self.clear_graph()
+        neighbours = self.table.neighbours
+        distances = self.distances
+        start_id = self.get_node_id(start)
+        end_id = self.get_node_id(end)
+        distances[start_id] = 0
+        pending = deque([start_id])
+        while pending:
+            current = pending.popleft()
+            if current == end_id:
+                break
+            for neighbour in neighbours[current]:
+                weight = self.weight(neighbour, end_id)
+                if weight is None:
+                    continue
+                new_distance = distances[current] + weight
+                if new_distance < distances[neighbour]:
+                    distances[neighbour] = new_distance
+                    self.predecessors[neighbour] = current
+                    if weight:
+                        pending.append(neighbour)
+                    else:
+                        pending.appendleft(neighbour)
+        return distances[end_id]
+
+    def make_shortest_path_astar(self, start, end):
+        """A* with the same heuristic as Graph.make_shortest_path_astar.
+        Returns the path as a list of Hex, or None.
+        """
+        self.clear_graph()
+        size = self.board_size
+        cells = self.table.cells
+        neighbours = self.table.neighbours
+        distances = self.distances
+        predecessors = self.predecessors
+        start_id = self.get_node_id(start)
+        end_id = self.get_node_id(end)
+
+        def heuristic(node):
+            if node == end_id:
+                return 0
+            if node >= cells:
+                return INFINITY
+            i, j = divmod(node, size)
+            if end.side == SidesEnum.TOP:
+                return i
+            if end.side == SidesEnum.BOTTOM:
+                return size - i
+            if end.side == SidesEnum.LEFT:
+                return j
+            return size - j
+
+        visited = bytearray(len(neighbours))
+        counter = itertools.count()
+        distances[start_id] = 0
+        pending = [(heuristic(start_id), next(counter), start_id)]
+        while pending:
+            _, _, current = heappop(pending)
+            if visited[current]:
+                continue
+            visited[current] = 1
+            if current == end_id:
+                return self.get_path(end_id)
+            for neighbour in neighbours[current]:
+                if self.colors[neighbour] == self.opponenet_color:
+                    continue
+                weight = 0 if self.colors[neighbour] == self.player_color else 1
+                tentative = distances[current] + weight
+                if tentative < distances[neighbour]:
+                    distances[neighbour] = tentative
+                    predecessors[neighbour] = current
+                    heappush(pending, (
+                        tentative + heuristic(neighbour), next(counter), neighbour))
+        return None
@@ -0,0 +1,361 @@
+import dataclasses
+import functools
+import random
+from lib.colors import ColorsEnum
+from lib.board.moves import Move
+from lib.board.distance import DistanceTracker
+from lib.board.union_find import UnionFind
+from lib.board.virtual import VirtualConnections
+
+
+@dataclasses.dataclass(frozen=True)
+class BoardMasks:
+    size: int
+    full: int
+    first_row: int
+    last_row: int
+    first_column: int
+    last_column: int
+    not_first_column: int
+    not_last_column: int
+
+
+@functools.lru_cache(maxsize=None)
+def get_board_masks(size):
+    full = (1 << (size * size)) - 1
+    first_row = (1 << size) - 1
+    first_column = 0
+    for i in range(size):
+        first_column |= 1 << (i * size)
+    last_column = first_column << (size - 1)
+    return BoardMasks(
+        size=size,
+        full=full,
+        first_row=first_row,
+        last_row=first_row << (size * (size - 1)),
+        first_column=first_column,
+        last_column=last_column,
+        not_first_column=full & ~first_column,
+        not_last_column=full & ~last_column,
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class Tracking:
+    """The trackers a searching board carries besides connections.
+    Virtual connections change the evaluation, so every board that
+    writes to one transposition table must agree on them; the worker
+    processes get this along with the evaluator.
+    """
+    distances: bool = False
+    virtual: bool = False
+
+    def apply(self, board):
+        board.track_connections()
+        if self.distances:
+            board.track_distances()
+        if self.virtual:
+            board.track_virtual_connections()
+        return board
+
+
+@functools.lru_cache(maxsize=None)
+def get_zobrist_keys(size):
+    """Fixed 64 bit keys per cell for Red and Blue stones, seeded by the
+    board size so hashes are stable across processes and games.
+    """
+    generator = random.Random(size)
+    red_keys = [generator.getrandbits(64) for _ in range(size * size)]
+    blue_keys = [generator.getrandbits(64) for _ in range(size * size)]
+    return red_keys, blue_keys
+
+
+class Bitboard:
+    """Hex board stored as one integer bitmask per colour. Cell (i, j) is
+    bit i * size + j. Red connects the first and last row, Blue the first
+    and last column.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.masks = get_board_masks(size)
+        self.red_keys, self.blue_keys = get_zobrist_keys(size)
+        self.red = 0
+        self.blue = 0
+        self.hash = 0
+        self.history = []
+        self.trackers = []
+        self.distances = None
+        self.connections = None
+        self.virtual = None
+
+    @classmethod
+    def from_lists(cls, board):
+        bitboard = cls(len(board))
+        for i in range(len(board)):
+            for j in range(len(board)):
+                if board[i][j] != ColorsEnum.FREE:
+                    bitboard.play(Move(i, j), board[i][j])
+        bitboard.history = []
+        return bitboard
+
+    @classmethod
+    def from_masks(cls, size, red, blue):
+        bitboard = cls(size)
+        bitboard.red = red
+        bitboard.blue = blue
+        bitboard.hash = bitboard.compute_hash()
+        return bitboard
+
+    def to_lists(self):
+        return [list(row) for row in self]
+
+    def copy(self):
+        board = Bitboard.__new__(Bitboard)
+        board.size = self.size
+        board.masks = self.masks
+        board.red_keys = self.red_keys
+        board.blue_keys = self.blue_keys
+        board.red = self.red
+        board.blue = self.blue
+        board.hash = self.hash
+        board.history = list(self.history)
+        board.trackers = []
+        board.distances = None
+        board.connections = None
+        board.virtual = None
+        return board
+
+    def track_distances(self):
+        """Keeps the distance layers of both colours across play and
+        undo, so each query only grows the layers a new stone can have
+        changed instead of searching the whole board. Copies are not
+        tracked.
+        """
+        if self.distances is None:
+            self.distances = DistanceTracker(self)
+            self.trackers.append(self.distances)
+        return self.distances
+
+    def track_connections(self):
+        """Keeps a union-find of stone groups and the four sides up to
+        date on every play and undo, so winner() is near O(1).
+        """
+        if self.connections is None:
+            self.connections = UnionFind(self)
+            self.trackers.append(self.connections)
+        return self.connections
+
+    def track_virtual_connections(self):
+        """Keeps the bridges and edge templates of both colours, so
+        connection distances count virtually connected stones as joined
+        and move generation can answer intrusions.
+        """
+        if self.virtual is None:
+            self.virtual = VirtualConnections(self)
+            self.trackers.append(self.virtual)
+        return self.virtual
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if i < 0 or i >= self.size:
+            raise IndexError("board row out of range")
+        return [self.get(i, j) for j in range(self.size)]
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self[i]
+
+    def get(self, i, j):
+        bit = 1 << (i * self.size + j)
+        if self.red & bit:
+            return ColorsEnum.RED
+        if self.blue & bit:
+            return ColorsEnum.BLUE
+        return ColorsEnum.FREE
+
+    def is_free(self, move):
+        return not (self.red | self.blue) >> (move.i * self.size + move.j) & 1
+
+    def stones(self, color):
+        if color == ColorsEnum.RED:
+            return self.red
+        if color == ColorsEnum.BLUE:
+            return self.blue
+        return self.free()
+
+    def free(self):
+        return self.masks.full & ~(self.red | self.blue)
+
+    def play(self, move, color):
+        cell = move.i * self.size + move.j
+        if color == ColorsEnum.RED:
+            self.red |= 1 << cell
+            self.hash ^= self.red_keys[cell]
+        else:
+            self.blue |= 1 << cell
+            self.hash ^= self.blue_keys[cell]
+        self.history.append((cell, color))
+        for tracker in self.trackers:
+            tracker.play(self, cell, color)
+
+    def undo(self):
+        cell, color = self.history.pop()
+        if color == ColorsEnum.RED:
+            self.red &= ~(1 << cell)
+            self.hash ^= self.red_keys[cell]
+        else:
+            self.blue &= ~(1 << cell)
+            self.hash ^= self.blue_keys[cell]
+        for tracker in self.trackers:
+            tracker.undo(self, cell)
+
+    def compute_hash(self):
+        board_hash = 0
+        for keys, mask in ((self.red_keys, self.red), (self.blue_keys, self.blue)):
+            while mask:
+                low = mask & -mask
+                board_hash ^= keys[low.bit_length() - 1]
+                mask ^= low
+        return board_hash
+
+    def move_at(self, cell):
+        return Move(cell // self.size, cell % self.size)
+
+    def moves_from_mask(self, mask):
+        moves = []
+        while mask:
+            low = mask & -mask
+            moves.append(self.move_at(low.bit_length() - 1))
+            mask ^= low
+        return moves
+
+    def free_moves(self):
+        return self.moves_from_mask(self.free())
+
+    def shift(self, mask, direction):
+        """Moves every cell of the mask one step in the given direction,
+        dropping cells that fall off the board.
+        """
+        di, dj = direction
+        if dj == -1:
+            mask &= self.masks.not_first_column
+        elif dj == 1:
+            mask &= self.masks.not_last_column
+        offset = di * self.size + dj
+        if offset > 0:
+            return (mask << offset) & self.masks.full
+        return mask >> -offset
+
+    def neighbours(self, mask):
+        size = self.size
+        left = mask & self.masks.not_first_column
+        right = mask & self.masks.not_last_column
+        return (
+            (left >> 1)
+            | (right << 1)
+            | (mask >> size)
+            | (mask << size)
+            | (right >> (size - 1))
+            | (left << (size - 1))
+        ) & self.masks.full
+
+    def flood(self, seed, allowed):
+        reach = seed & allowed
+        while True:
+            grown = (reach | self.neighbours(reach)) & allowed
+            if grown == reach:
+                return reach
+            reach = grown
+
+    def get_edges(self, color):
+        if color == ColorsEnum.RED:
+            return self.masks.first_row, self.masks.last_row
+        return self.masks.first_column, self.masks.last_column
+
+    def distance_levels(self, color, levels=None):
+        """0-1 BFS by whole layers: levels[k] holds every cell reachable
+        from the start edge by placing at most k more stones. Returns None
+        if the other edge cannot be reached. levels, if given, are the
+        first layers, already known, to carry on from.
+        """
+        start, end = self.get_edges(color)
+        return self.layers(self.stones(color), self.free(), start, end, levels)
+
+    def layers(self, own, free, start, end, levels=None):
+        'distance_levels for any stones and pair of edges.'
+        if levels is None:
+            reach = self.flood(start & own, own)
+            levels = [reach]
+        else:
+            reach = levels[-1]
+        while not reach & end:
+            frontier = (self.neighbours(reach) | start) & free & ~reach
+            if not frontier:
+                return None
+            reach |= frontier
+            reach = self.flood(reach, reach | own)
+            levels.append(reach)
+        return levels
+
+    def winner(self):
+        """The colour that has joined its two edges, or FREE."""
+        if self.connections is not None:
+            return self.connections.winner()
+        for color in (ColorsEnum.RED, ColorsEnum.BLUE):
+            own = self.stones(color)
+            start, end = self.get_edges(color)
+            if self.flood(start & own, own) & end:
+                return color
+        return ColorsEnum.FREE
+
+    def connection_distance(self, color, virtual=True):
+        """Stones the colour still needs to connect. With virtual
+        connections tracked, stones joined by a holding template count as
+        connected unless virtual is False.
+        """
+        if virtual and self.virtual is not None:
+            levels = self.virtual.distance_levels(self, color)
+        elif self.distances is not None:
+            return self.distances.connection_distance(self, color)
+        else:
+            levels = self.distance_levels(color)
+        if levels is None:
+            return float("inf")
+        return len(levels) - 1
+
+    def shortest_path_moves(self, color):
+        """Free cells along one shortest connection for the colour, found
+        by walking the distance levels back from the end edge.
+        """
+        if self.distances is not None:
+            levels = self.distances.levels(self, color)
+        else:
+            levels = self.distance_levels(color)
+        if levels is None:
+            return []
+        own = self.stones(color)
+        free = self.free()
+        start, end = self.get_edges(color)
+
+        path = 0
+        level = len(levels) - 1
+        current = levels[level] & end
+        current &= -current
+        while True:
+            frontier = levels[level] & ~levels[level - 1] if level else levels[0]
+            if current & own:
+                group = self.flood(current, own & frontier)
+                if level == 0:
+                    break
+                current = self.neighbours(group) & frontier & free
+                current &= -current
+            path |= current
+            if level == 1 and current & start:
+                break
+            level -= 1
+            current = self.neighbours(current) & levels[level]
+            current &= -current
+        return self.moves_from_mask(path)
@@ -0,0 +1,154 @@
+from lib.colors import ColorsEnum
+
+INFINITY = float("inf")
+
+
+class DistanceTracker:
+    """Per-cell connection distances of both colours, kept as the layers
+    of Bitboard.distance_levels: levels[k] holds every cell the colour
+    reaches by placing at most k more stones, so a cell's distance is the
+    first layer holding it.
+
+    The board calls play/undo on every change, which only push and pop a
+    stack entry. Layers are worked out when asked for, starting from the
+    closest position up the stack that has them. A stone whose cell had
+    distance d leaves every layer below d - 1 as it was (below d for an
+    opponent stone): distances along a shortest route never decrease, so
+    no route to those cells crosses the stone, and an own stone can bring
+    nothing closer than d - 1. Only the layers from there on are grown
+    again, which is the region the stone can have changed.
+
+    Leaves of the search only need the connection distance one stone
+    after a position whose layers are known, and most of the time that
+    takes no search at all, see path_cells.
+    """
+
+    def __init__(self, board):
+        # One entry per position: the cell and colour played to reach it,
+        # then per colour the layers, the connection distance and the
+        # path cells, each filled in when first asked for
+        self.stack = [[None, None, {}, {}, {}]]
+
+    def play(self, board, cell, color):
+        self.stack.append([cell, color, {}, {}, {}])
+
+    def undo(self, board, cell):
+        self.stack.pop()
+
+    def levels(self, board, color):
+        """The distance layers of the colour in the board's current
+        position, or None if it cannot connect.
+        """
+        stack = self.stack
+        entry = stack[-1]
+        if color in entry[2]:
+            return entry[2][color]
+
+        # Closest position with known layers and the lowest layer since
+        # then that a stone may have changed
+        index = len(stack) - 1
+        while index > 0 and color not in stack[index - 1][2]:
+            index -= 1
+        if index == 0:
+            levels = board.distance_levels(color)
+        else:
+            parent_levels = stack[index - 1][2][color]
+            if parent_levels is None:
+                # Stones never shorten the opponent's connection
+                if all(entry[1] != color for entry in stack[index:]):
+                    levels = None
+                else:
+                    levels = board.distance_levels(color)
+            else:
+                keep = len(parent_levels)
+                for entry in stack[index:]:
+                    distance = get_cell_distance(parent_levels, entry[0])
+                    keep = min(keep, distance if entry[1] != color else distance - 1)
+                if keep <= 0:
+                    levels = board.distance_levels(color)
+                else:
+                    levels = board.distance_levels(color, parent_levels[:keep])
+        stack[-1][2][color] = levels
+        return levels
+
+    def connection_distance(self, board, color):
+        entry = self.stack[-1]
+        if color in entry[2]:
+            levels = entry[2][color]
+            return INFINITY if levels is None else len(levels) - 1
+        if color in entry[3]:
+            return entry[3][color]
+        distance = None
+        if len(self.stack) > 1 and color in self.stack[-2][2]:
+            distance = self.distance_after(board, color)
+        if distance is None:
+            levels = self.levels(board, color)
+            distance = INFINITY if levels is None else len(levels) - 1
+        entry[3][color] = distance
+        return distance
+
+    def distance_after(self, board, color):
+        """The connection distance one stone after a position whose layers
+        are known, or None when it takes a search. An own stone on a
+        shortest route shortens it by one, anywhere else it changes
+        nothing. An opponent stone only lengthens the connection when it
+        takes the last free cell of its layer left on shortest routes.
+        """
+        cell, placed, _, _, _ = self.stack[-1]
+        parent = self.stack[-2]
+        parent_levels = parent[2][color]
+        if parent_levels is None:
+            return INFINITY if placed != color else None
+        distance = len(parent_levels) - 1
+        if distance == 0:
+            return 0
+        if color not in parent[4]:
+            parent[4][color] = self.path_cells(board, color, parent_levels, cell, placed)
+        cells, layers = parent[4][color]
+        bit = 1 << cell
+        if not cells & bit:
+            return distance
+        if placed == color:
+            return distance - 1
+        layer = layers[get_cell_distance(parent_levels, cell)]
+        if layer == bit:
+            return None
+        return distance
+
+    def path_cells(self, board, color, levels, cell, placed):
+        """The free cells on shortest routes in the position before the
+        last stone, and those cells by distance. A free cell is on one
+        when its distances from both edges add up to the connection
+        distance plus one, for the cell itself. Each route has exactly one
+        free cell of each distance.
+        """
+        bit = 1 << cell
+        red, blue = board.red, board.blue
+        if placed == ColorsEnum.RED:
+            red &= ~bit
+        else:
+            blue &= ~bit
+        own = red if color == ColorsEnum.RED else blue
+        free = board.masks.full & ~(red | blue)
+        start, end = board.get_edges(color)
+        backward = board.layers(own, free, end, start)
+
+        distance = len(levels) - 1
+        cells = 0
+        layers = [0] * (distance + 1)
+        for k in range(1, distance + 1):
+            exact = levels[k] & ~levels[k - 1]
+            other = distance + 1 - k
+            exact_backward = backward[other] & ~backward[other - 1]
+            layers[k] = exact & exact_backward & free
+            cells |= layers[k]
+        return cells, layers
+
+
+def get_cell_distance(levels, cell):
+    'Index of the first layer holding the cell, len(levels) if none does.'
+    bit = 1 << cell
+    for k, level in enumerate(levels):
+        if level & bit:
+            return k
+    return len(levels)
@@ -1,6 +1,7 @@
 from lib.board.sides import SidesEnum, get_color_for_side
 from lib.board.hex import Hex
 from lib.board.moves import Move, get_active_moves
+from lib.board.neighbours import get_neighbour_table
 from lib.colors import ColorsEnum, get_oposing_color, int_color_to_char
 import copy
 import queue
@@ -10,8 +11,7 @@ from typing import Any
 import itertools
 from heapq import heappop, heappush
 from lib.board.moves import Move
-import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
 
 
 class Heap:
@@ -63,72 +63,37 @@ class Graph():
         }
 
         self.set_player_color(player_color)
-        self.verbose = False
         self.min_path_distance = float("inf")
         self.board_size = len(board)
 
-    def clear_graph(self):
-        for i in range(len(self.board)):
-            for j in range(len(self.board)):
-                self.board[i][j].distance_from_start = float("inf")
+        self.neighbour_table = get_neighbour_table(self.board_size)
+        self.nodes = [h for row in self.board for h in row]
+        for side in sorted(self.sides, key=self.neighbour_table.side_id):
+            self.nodes.append(self.sides[side])
+        # Hex is frozen, so path lengths are kept here by node id
+        self.distances = [float("inf")] * len(self.nodes)
 
-        for key in self.sides.keys():
-            self.sides[key].distance_from_start = float("inf")
+    def get_node_id(self, piece: Hex):
+        if piece.side:
+            return self.neighbour_table.side_id(piece.side)
+        return piece.move.i * self.board_size + piece.move.j
 
-        self.min_path_distance.distance_from_start = float("inf")
+    def clear_graph(self):
+        self.distances = [float("inf")] * len(self.nodes)
+        self.min_path_distance = float("inf")
 
     def get_neighbours(self, piece: Hex):
-
-        if piece.side == SidesEnum.TOP:
-            return [self.board[0][j] for j in range(self.board_size)]
-
-        if piece.side == SidesEnum.BOTTOM:
-            return [self.board[self.board_size-1][j] for j in range(self.board_size)]
-
-        if piece.side == SidesEnum.LEFT:
-            return [self.board[i][0] for i in range(self.board_size)]
-
-        if piece.side == SidesEnum.RIGHT:
-            return [self.board[i][len(self.board[0])-1] for i in range(self.board_size)]
-
-        offsets = [
-            (0, -1), (0, +1), (-1, 0), (+1, 0), (-1, +1), (+1, -1)
+        nodes = self.nodes
+        return [
+            nodes[node]
+            for node in self.neighbour_table.neighbours[self.get_node_id(piece)]
         ]
 
-        neighbours = []
-
-        for offset in offsets:
-            new_i = piece.move.i + offset[0]
-            new_j = piece.move.j + offset[1]
-
-            if new_i < self.board_size and new_i >= 0 and new_j < self.board_size and new_j >= 0:
-                neighbours.append(self.board[new_i][new_j])
-
-            elif new_i == -1:
-                neighbours.append(self.sides[SidesEnum.TOP])
-
-            elif new_i == self.board_size:
-                neighbours.append(self.sides[SidesEnum.BOTTOM])
-
-            elif new_j == -1:
-                neighbours.append(self.sides[SidesEnum.LEFT])
-
-            elif new_j == self.board_size:
-                neighbours.append(self.sides[SidesEnum.RIGHT])
-
-        return set(neighbours)
-
     def get_piece_path_length(self, piece):
-        if piece.side:
-            return self.sides[piece.side].distance_from_start
-        else:
-            return self.board[piece.move.i][piece.move.j].distance_from_start
+        return self.distances[self.get_node_id(piece)]
 
-    def update_piece(self, piece):
-        if piece.side:
-            self.sides[piece.side].distance_from_start = piece.distance_from_start
-        else:
-            self.board[piece.move.i][piece.move.j].distance_from_start = piece.distance_from_start
+    def update_piece(self, piece, distance):
+        self.distances[self.get_node_id(piece)] = distance
 
     def get_piece_from_move(self, move):
         if move.i in range(len(self.board)) and move.j in range(len(self.board)):
@@ -185,18 +150,10 @@ class Graph():
             except KeyError:
                 break
 
-            if self.verbose:
-                print(
-                    f"Curent node = [{self.get_tuple_from_piece(current)}] side = [{current.side}]")
-
             if visited[current]:
                 continue
             visited[current] = True
 
-            if self.verbose:
-                print(
-                    f"Processing node = [{self.get_tuple_from_piece(current)}] side = [{current.side}]")
-
             if current == end:
                 total_path = [end]
                 while current in predecessors:
@@ -206,10 +163,6 @@ class Graph():
                 return total_path
 
             for neighbour in self.get_neighbours(current):
-                if self.verbose:
-                    print(
-                        f"Processing neighbour = [{self.get_tuple_from_piece(neighbour)}] side = [{neighbour.side}]")
-
                 if neighbour.color == get_oposing_color(self.player_color):
                     continue
 
@@ -227,6 +180,48 @@ class Graph():
 
         return None
 
+    def make_shortest_path_01bfs(self, start, end):
+        """Exact connection distance between two sides: the number of free
+        cells the player still has to fill. Edge weights are only 0 (own
+        stone or side) and 1 (free cell), so a deque replaces the heap.
+        Cells are indexed i * board_size + j, sides follow after them.
+        """
+        table = self.neighbour_table
+        cells = table.cells
+        colors = [h.color for row in self.board for h in row]
+        opponent = get_oposing_color(self.player_color)
+
+        distance = [float("inf")] * len(table.neighbours)
+        start_id = table.side_id(start.side)
+        end_id = table.side_id(end.side)
+        distance[start_id] = 0
+        pending = deque([start_id])
+
+        while pending:
+            current = pending.popleft()
+            if current == end_id:
+                return distance[end_id]
+
+            for neighbour in table.neighbours[current]:
+                if neighbour >= cells:
+                    if neighbour != end_id:
+                        continue
+                    weight = 0
+                elif colors[neighbour] == opponent:
+                    continue
+                else:
+                    weight = 0 if colors[neighbour] == self.player_color else 1
+
+                new_distance = distance[current] + weight
+                if new_distance < distance[neighbour]:
+                    distance[neighbour] = new_distance
+                    if weight:
+                        pending.append(neighbour)
+                    else:
+                        pending.appendleft(neighbour)
+
+        return distance[end_id]
+
     def set_player_color(self, player_color):
         self.player_color = player_color
         self.opponenet_color = get_oposing_color(player_color)
@@ -252,15 +247,9 @@ class Graph():
 
             return len(self.board) - node.move.j
 
-        if self.verbose:
-            print(
-                f"\nplace : [{current.move.i}][{current.move.j}] [{current.side}] dist:[{distance}] [{[v for v in visited]}]")
-
         if current.side == end.side:
             if distance < self.min_path_distance:
                 self.min_path_distance = distance
-            if self.verbose:
-                print("\n return")
             return distance
 
         if distance > self.min_path_distance:
@@ -338,9 +327,6 @@ class Graph():
         # return min_distance
 
     def make_shortest_path(self, start, end):
-        if self.verbose:
-            print("\nStarting algo")
-        start_algo = datetime.datetime.now()
         current_vertexes = Heap()
 
         for row in self.board:
@@ -353,38 +339,21 @@ class Graph():
                 current_vertexes.add_task(side.move, float("inf"))
 
         start_vertex = start
-        start_vertex.distance_from_start = 0
-
         current_vertexes.add_task(start.move, 0)
-
-        self.update_piece(start_vertex)
-
-        if self.verbose:
-            print(f"Setting up took {datetime.datetime.now() - start_algo}")
+        self.update_piece(start_vertex, 0)
 
         current_vertex = start_vertex
         while True:
 
-            start_loop = datetime.datetime.now()
             try:
                 current_vertex = self.get_piece_from_move(
                     current_vertexes.pop_task())
             except KeyError:
                 return
 
-            if self.verbose:
-                print(
-                    f"\nGetting next vertex took {datetime.datetime.now() - start_loop}")
-
-            start_neighbour = datetime.datetime.now()
             neighbours = self.get_neighbours(current_vertex)
 
-            if self.verbose:
-                print(
-                    f"Got neighbours in {datetime.datetime.now() - start_neighbour}")
-
             for neighbour in neighbours:
-                start_neighbour = datetime.datetime.now()
                 if neighbour.move not in current_vertexes.entry_finder:
                     continue
                 if neighbour.color == get_oposing_color(self.player_color):
@@ -393,33 +362,15 @@ class Graph():
 
                 weight = 0.0 if neighbour.color == self.player_color else 1.0
 
-                new_weight = current_vertex.distance_from_start + weight
-
-                if new_weight < neighbour.distance_from_start:
-                    start_update = datetime.datetime.now()
+                new_weight = self.get_piece_path_length(current_vertex) + weight
 
+                if new_weight < self.get_piece_path_length(neighbour):
                     current_vertexes.add_task(neighbour.move, new_weight)
 
-                    neighbour.distance_from_start = new_weight
-
-                    self.update_piece(neighbour)
-
-                    if self.verbose:
-                        print(
-                            f"Updating the neighbour took {datetime.datetime.now() - start_update}")
+                    self.update_piece(neighbour, new_weight)
 
                     if neighbour.side == end.side:
-                        if self.verbose:
-                            print(
-                                f"\nThe entire algo took {datetime.datetime.now() - start_algo}\n")
                         return
-                if self.verbose:
-                    print(
-                        f"Processing neighbour {neighbour.move.i} {neighbour.move.j} {neighbour.side} took {datetime.datetime.now() - start_neighbour}")
-
-            if self.verbose:
-                print(
-                    f"Processing one vertex took {datetime.datetime.now() - start_loop}")
 
             # if current_vertexes.empty():
             #     return
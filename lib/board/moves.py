@@ -1,4 +1,4 @@
-from lib.colors import ColorsEnum
+from lib.board.neighbours import DIRECTIONS
 import dataclasses
 import random
 ACTIVE_REGION_BOUNDS = 2
@@ -11,52 +11,24 @@ class Move:
 
 
 def get_possible_moves(board):
-    moves = {}
-    for i in range(len(board)):
-        for j in range(len(board[i])):
-            if board[i][j] == ColorsEnum.FREE:
-                moves[Move(i, j)] = True
-    moves = list(moves.keys())
+    moves = board.free_moves()
     random.shuffle(moves)
     return moves
 
 
-def get_connected_region(board, i, j):
-
-    board_size = len(board)
-
-    moves = {}
-    offsets = [
-        (0, -1),
-        (0, +1),
-        (-1, 0),
-        (+1, 0),
-        (-1, +1),
-        (+1, -1),
-    ]
-    for offset in offsets:
-        offset_factor = 1
-        while True:
-            new_i = i + offset[0] * offset_factor
-            new_j = j + offset[1] * offset_factor
-            if new_i >= board_size or new_i < 0 or new_j >= board_size or new_j < 0:
-                break
-            if board[new_i][new_j] == ColorsEnum.FREE:
-                moves[Move(new_i, new_j)] = True
-
-            if offset_factor == ACTIVE_REGION_BOUNDS:
-                break
-
-            offset_factor += 1
-    return moves
+def get_connected_region(board, mask):
+
+    region = 0
+    for offset in DIRECTIONS:
+        ray = mask
+        for _ in range(ACTIVE_REGION_BOUNDS):
+            ray = board.shift(ray, offset)
+            region |= ray
+    return region & board.free()
 
 
 def get_active_moves(board):
-    moves = {}
-    for i in range(len(board)):
-        for j in range(len(board[i])):
-            if board[i][j] != ColorsEnum.FREE:
-                moves.update(get_connected_region(board, i, j))
-    moves = list(moves.keys())
+    moves = board.moves_from_mask(
+        get_connected_region(board, board.red | board.blue))
     random.shuffle(moves)
     return moves
@@ -0,0 +1,82 @@
+import dataclasses
+import functools
+from typing import Dict, Tuple
+from lib.board.sides import SidesEnum
+from lib.colors import ColorsEnum
+
+# Same neighbour order as Graph.get_neighbours always used
+DIRECTIONS = [
+    (0, -1), (0, +1), (-1, 0), (+1, 0), (-1, +1), (+1, -1)
+]
+
+
+@dataclasses.dataclass(frozen=True)
+class NeighbourTable:
+    """Adjacency of one board size over node ids: cell (i, j) is
+    i * size + j and the four sides follow the cells, side s being
+    cells + s.value - 1. neighbours[node] lists every adjacent node,
+    sides included; cell_neighbours[cell] only the adjacent cells.
+    """
+    size: int
+    cells: int
+    side_ids: Dict[SidesEnum, int]
+    neighbours: Tuple[Tuple[int, ...], ...]
+    cell_neighbours: Tuple[Tuple[int, ...], ...]
+
+    def side_id(self, side):
+        return self.side_ids[side]
+
+
+@functools.lru_cache(maxsize=None)
+def get_neighbour_table(size):
+    cells = size * size
+    side_ids = {side: cells + side.value - 1 for side in SidesEnum}
+    neighbours = []
+    cell_neighbours = []
+    for i in range(size):
+        for j in range(size):
+            adjacent = []
+            for di, dj in DIRECTIONS:
+                new_i = i + di
+                new_j = j + dj
+                if 0 <= new_i < size and 0 <= new_j < size:
+                    adjacent.append(new_i * size + new_j)
+                elif new_i == -1:
+                    adjacent.append(side_ids[SidesEnum.TOP])
+                elif new_i == size:
+                    adjacent.append(side_ids[SidesEnum.BOTTOM])
+                elif new_j == -1:
+                    adjacent.append(side_ids[SidesEnum.LEFT])
+                elif new_j == size:
+                    adjacent.append(side_ids[SidesEnum.RIGHT])
+            # A corner touches the same side from two directions
+            adjacent = tuple(dict.fromkeys(adjacent))
+            neighbours.append(adjacent)
+            cell_neighbours.append(tuple(node for node in adjacent if node < cells))
+
+    edges = {
+        SidesEnum.TOP: range(size),
+        SidesEnum.BOTTOM: range(cells - size, cells),
+        SidesEnum.LEFT: range(0, cells, size),
+        SidesEnum.RIGHT: range(size - 1, cells, size),
+    }
+    for side in sorted(SidesEnum, key=side_ids.get):
+        neighbours.append(tuple(edges[side]))
+
+    return NeighbourTable(
+        size=size,
+        cells=cells,
+        side_ids=side_ids,
+        neighbours=tuple(neighbours),
+        cell_neighbours=tuple(cell_neighbours),
+    )
+
+
+def get_cell_neighbours(size):
+    return get_neighbour_table(size).cell_neighbours
+
+
+def get_edge_cells(size, color):
+    if color == ColorsEnum.RED:
+        return range(size), range(size * (size - 1), size * size)
+    return range(0, size * size, size), range(size - 1, size * size, size)
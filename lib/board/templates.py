@@ -0,0 +1,161 @@
+import dataclasses
+import functools
+from typing import Tuple
+from lib.board.neighbours import DIRECTIONS
+from lib.colors import ColorsEnum
+
+# Relative coordinates are (row, column) with row 0 next to the edge the
+# template connects to, oriented like Red's top edge. EDGE is the target
+# of edge templates.
+EDGE = "edge"
+
+
+@dataclasses.dataclass(frozen=True)
+class Template:
+    """A virtual connection pattern: the anchor stones connect to target
+    (another stone or the edge) as long as the carrier cells are free,
+    whoever moves first. Cells are relative to the first anchor.
+    """
+    name: str
+    anchors: Tuple[Tuple[int, int], ...]
+    carrier: Tuple[Tuple[int, int], ...]
+    target: object
+
+    @property
+    def cells(self):
+        return self.anchors + self.carrier
+
+
+def get_bridges():
+    """Two stones with exactly two common neighbours, both free: if one
+    is taken the other completes the connection.
+    """
+    bridges = []
+    for di, dj in [(1, 1), (-1, -1), (-1, 2), (1, -2), (2, -1), (-2, 1)]:
+        first = {(ni, nj) for ni, nj in DIRECTIONS}
+        second = {(di + ni, dj + nj) for ni, nj in DIRECTIONS}
+        carrier = tuple(sorted(first & second))
+        bridges.append(Template("bridge", ((0, 0), (di, dj)), carrier, (di, dj)))
+    return tuple(bridges)
+
+
+EDGE_TEMPLATES = (
+    # Template II: a stone on the second row and the two edge cells below it
+    Template("edge-II", ((1, 0),), ((0, 0), (0, 1)), EDGE),
+    # Template IIIa, the ziggurat, in both orientations
+    Template(
+        "ziggurat-left", ((2, 0),),
+        ((2, -1), (1, -1), (1, 0), (1, 1), (0, -1), (0, 0), (0, 1), (0, 2)),
+        EDGE),
+    Template(
+        "ziggurat-right", ((2, 0),),
+        ((2, 1), (1, 0), (1, 1), (1, 2), (0, 0), (0, 1), (0, 2), (0, 3)),
+        EDGE),
+)
+
+
+class TemplateGame:
+    """The game played inside one template's carrier: the owner tries to
+    join the anchors to the target, the defender to cut them. Carrier
+    cells are numbered in order; a position is a pair of bitmasks (owner
+    stones, defender stones) over those numbers. Small enough to solve
+    exhaustively.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        cells = list(template.cells)
+        index = {cell: number for number, cell in enumerate(cells)}
+        self.carrier_offset = len(template.anchors)
+        self.adjacent = []
+        for i, j in cells:
+            self.adjacent.append([
+                index[(i + di, j + dj)]
+                for di, dj in DIRECTIONS
+                if (i + di, j + dj) in index
+            ])
+        if template.target == EDGE:
+            self.target = [index[cell] for cell in cells if cell[0] == 0]
+        else:
+            self.target = [index[template.target]]
+        self.anchors = (1 << self.carrier_offset) - 1
+        self.carrier_cells = len(template.carrier)
+
+    def connected(self, own):
+        'Whether the owner stones (anchors included) reach the target.'
+        own |= self.anchors
+        reached = 1
+        pending = [0]
+        while pending:
+            cell = pending.pop()
+            if cell in self.target:
+                return True
+            for neighbour in self.adjacent[cell]:
+                bit = 1 << neighbour
+                if own & bit and not reached & bit:
+                    reached |= bit
+                    pending.append(neighbour)
+        return False
+
+    def free_cells(self, own, other):
+        for number in range(self.carrier_cells):
+            bit = 1 << (number + self.carrier_offset)
+            if not (own | other) & bit:
+                yield bit
+
+    @functools.lru_cache(maxsize=None)
+    def holds(self, own, other):
+        'Owner stays connected with the defender to move.'
+        if self.connected(own):
+            return True
+        for bit in self.free_cells(own, other):
+            if not self.wins(own, other | bit):
+                return False
+        return any(True for _ in self.free_cells(own, other))
+
+    @functools.lru_cache(maxsize=None)
+    def wins(self, own, other):
+        'Owner can connect with the owner to move.'
+        if self.connected(own):
+            return True
+        return any(self.holds(own | bit, other) for bit in self.free_cells(own, other))
+
+    def replies(self, own, other):
+        'Carrier bits that make the template hold again.'
+        return [
+            bit for bit in self.free_cells(own, other)
+            if self.holds(own | bit, other)
+        ]
+
+
+@functools.lru_cache(maxsize=None)
+def get_template_games():
+    'Every template with its solved game, checked to hold when empty.'
+    games = []
+    for template in get_bridges() + EDGE_TEMPLATES:
+        game = TemplateGame(template)
+        assert game.holds(0, 0), template.name
+        games.append(game)
+    return tuple(games)
+
+
+def orient(size, color, far_edge, anchor, cell):
+    """Board cell of a relative template cell, for a template anchored at
+    the given board cell and facing the colour's first (or far) edge.
+    Returns None off the board.
+    """
+    i, j = anchor
+    row, column = cell
+    if color == ColorsEnum.RED:
+        if far_edge:
+            position = (size - 1 - row, j - column)
+        else:
+            position = (row, j + column)
+    else:
+        if far_edge:
+            position = (i - column, size - 1 - row)
+        else:
+            position = (i + column, row)
+    if 0 <= position[0] < size and 0 <= position[1] < size:
+        return position
+    return None
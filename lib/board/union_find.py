@@ -0,0 +1,90 @@
+from lib.board.sides import SidesEnum, get_sides_for_color
+from lib.board.neighbours import get_neighbour_table, get_edge_cells
+from lib.colors import ColorsEnum
+
+
+class UnionFind:
+    """Disjoint sets over the cells plus the four virtual side nodes, kept
+    in step with a Bitboard. Union by size without path compression, so
+    every union can be rolled back by undo in O(1); find is O(log n).
+    """
+
+    def __init__(self, board):
+        self.size = board.size
+        self.cells = board.size * board.size
+        self.table = get_neighbour_table(board.size)
+        self.neighbours = self.table.cell_neighbours
+        self.edges = {}
+        for color in (ColorsEnum.RED, ColorsEnum.BLUE):
+            start, end = get_edge_cells(board.size, color)
+            first_side, second_side = self.side_nodes(color)
+            for cell in end:
+                self.edges.setdefault((cell, color), []).append(second_side)
+            for cell in start:
+                self.edges.setdefault((cell, color), []).append(first_side)
+        self.changes = []
+        self.load(board)
+
+    def side_node(self, side):
+        return self.table.side_id(side)
+
+    def side_nodes(self, color):
+        first_side, second_side = get_sides_for_color(color)
+        return self.side_node(first_side), self.side_node(second_side)
+
+    def load(self, board):
+        self.parent = list(range(self.cells + len(SidesEnum)))
+        self.set_size = [1] * len(self.parent)
+        self.colors = bytearray(self.cells)
+        changed = []
+        for cell in range(self.cells):
+            color = board.get(*divmod(cell, self.size))
+            if color != ColorsEnum.FREE:
+                self.join(cell, color, changed)
+
+    def find(self, node):
+        parent = self.parent
+        while parent[node] != node:
+            node = parent[node]
+        return node
+
+    def union(self, first, second, changed):
+        first = self.find(first)
+        second = self.find(second)
+        if first == second:
+            return
+        if self.set_size[first] < self.set_size[second]:
+            first, second = second, first
+        self.parent[second] = first
+        self.set_size[first] += self.set_size[second]
+        changed.append((second, first))
+
+    def join(self, cell, color, changed):
+        self.colors[cell] = color
+        for neighbour in self.neighbours[cell]:
+            if self.colors[neighbour] == color:
+                self.union(cell, neighbour, changed)
+        for side in self.edges.get((cell, color), ()):
+            self.union(cell, side, changed)
+
+    def play(self, board, cell, color):
+        changed = []
+        self.join(cell, color, changed)
+        self.changes.append((cell, changed))
+
+    def undo(self, board, cell):
+        cell, changed = self.changes.pop()
+        for child, root in reversed(changed):
+            self.parent[child] = child
+            self.set_size[root] -= self.set_size[child]
+        self.colors[cell] = ColorsEnum.FREE
+
+    def connected(self, color):
+        first_side, second_side = self.side_nodes(color)
+        return self.find(first_side) == self.find(second_side)
+
+    def winner(self):
+        for color in (ColorsEnum.RED, ColorsEnum.BLUE):
+            if self.connected(color):
+                return color
+        return ColorsEnum.FREE
@@ -0,0 +1,177 @@
+import dataclasses
+from typing import Any, Optional, Tuple
+from lib.board.templates import EDGE, get_template_games, orient
+from lib.colors import ColorsEnum
+
+START_EDGE = 0
+END_EDGE = 1
+
+
+@dataclasses.dataclass(frozen=True)
+class Link:
+    """One template placed on the board: cells are board cells in the
+    order of the template game (anchors, then carrier); edge says which
+    edge of the colour it reaches, None for a bridge between the first
+    two anchors.
+    """
+    color: ColorsEnum
+    game: Any
+    cells: Tuple[int, ...]
+    carrier: int
+    edge: Optional[int]
+
+
+class VirtualConnections:
+    """Bridges and edge templates of both colours, kept in step with a
+    Bitboard. Templates are placed when their last anchor stone is played
+    and dropped when it is undone; whether a placed template holds is
+    read from the board when asked, using the solved template games, so
+    the links only depend on the position and not on the move order.
+    """
+
+    def __init__(self, board):
+        self.size = board.size
+        self.games = get_template_games()
+        self.changes = []
+        self.load(board)
+
+    def load(self, board):
+        self.links = []
+        placed = 0
+        for cell in range(self.size * self.size):
+            color = board.get(*divmod(cell, self.size))
+            if color != ColorsEnum.FREE:
+                self.links.extend(self.place(board, cell, color, placed))
+                placed |= 1 << cell
+
+    def place(self, board, cell, color, partners):
+        """Templates anchored at a new stone: bridges to own stones among
+        partners and edge templates towards both edges of the colour.
+        """
+        links = []
+        own = board.stones(color) & partners
+        anchor = divmod(cell, self.size)
+        for game in self.games:
+            template = game.template
+            if template.target == EDGE:
+                for edge in (START_EDGE, END_EDGE):
+                    origin = orient(self.size, color, edge, anchor, template.anchors[0])
+                    if origin != anchor:
+                        continue
+                    cells = [
+                        orient(self.size, color, edge, anchor, relative)
+                        for relative in template.cells
+                    ]
+                    links.append(self.link(board, color, game, cells, edge))
+            else:
+                di, dj = template.anchors[1]
+                other = (anchor[0] + di, anchor[1] + dj)
+                if not self.on_board(other) or not own >> (other[0] * self.size + other[1]) & 1:
+                    continue
+                cells = [
+                    (anchor[0] + i, anchor[1] + j) for i, j in template.cells
+                ]
+                links.append(self.link(board, color, game, cells, None))
+        return [link for link in links if link is not None]
+
+    def on_board(self, cell):
+        return cell is not None and 0 <= cell[0] < self.size and 0 <= cell[1] < self.size
+
+    def link(self, board, color, game, cells, edge):
+        if not all(self.on_board(cell) for cell in cells):
+            return None
+        cells = tuple(i * self.size + j for i, j in cells)
+        carrier = 0
+        for cell in cells[len(game.template.anchors):]:
+            carrier |= 1 << cell
+        return Link(color, game, cells, carrier, edge)
+
+    def state(self, board, link):
+        'The template game position of a link: (owner bits, defender bits).'
+        own = board.stones(link.color)
+        other = board.blue if link.color == ColorsEnum.RED else board.red
+        own_bits = 0
+        other_bits = 0
+        for number, cell in enumerate(link.cells):
+            if own >> cell & 1:
+                own_bits |= 1 << number
+            elif other >> cell & 1:
+                other_bits |= 1 << number
+        return own_bits & ~link.game.anchors, other_bits
+
+    def holds(self, board, link):
+        if not (board.red | board.blue) & link.carrier:
+            return True
+        return link.game.holds(*self.state(board, link))
+
+    def play(self, board, cell, color):
+        partners = board.stones(color) & ~(1 << cell)
+        links = self.place(board, cell, color, partners)
+        self.links.extend(links)
+        self.changes.append((cell, len(links)))
+
+    def undo(self, board, cell):
+        cell, change = self.changes.pop()
+        if change:
+            del self.links[-change:]
+
+    def connections(self, board, color):
+        'Links of the colour that hold with the opponent to move.'
+        return [
+            link for link in self.links
+            if link.color == color and self.holds(board, link)
+        ]
+
+    def responses(self, board, color):
+        """Mask of the cells that repair an intruded link of the colour:
+        its template no longer holds, but does after one of these moves.
+        """
+        replies = 0
+        for link in self.links:
+            if link.color != color or self.holds(board, link):
+                continue
+            own, other = self.state(board, link)
+            for bit in link.game.replies(own, other):
+                replies |= 1 << link.cells[bit.bit_length() - 1]
+        return replies
+
+    def distance_levels(self, board, color):
+        """Like Bitboard.distance_levels, but stones joined by a holding
+        bridge count as one group and stones with a holding edge template
+        count as touching that edge.
+        """
+        own = board.stones(color)
+        free = board.free()
+        start, end = board.get_edges(color)
+        joins = []
+        for link in self.connections(board, color):
+            if link.edge is None:
+                joins.append((1 << link.cells[0], 1 << link.cells[1]))
+            elif link.edge == START_EDGE:
+                start |= 1 << link.cells[0]
+            else:
+                end |= 1 << link.cells[0]
+
+        def grow(reach, allowed):
+            while True:
+                reach = board.flood(reach, allowed)
+                added = 0
+                for first, second in joins:
+                    if reach & first and not reach & second:
+                        added |= second
+                    elif reach & second and not reach & first:
+                        added |= first
+                if not added:
+                    return reach
+                reach |= added
+
+        reach = grow(start & own, own)
+        levels = [reach]
+        while not reach & end:
+            frontier = (board.neighbours(reach) | start) & free & ~reach
+            if not frontier:
+                return None
+            reach |= frontier
+            reach = grow(reach, reach | own)
+            levels.append(reach)
+        return levels
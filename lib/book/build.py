@@ -0,0 +1,128 @@
+"""Offline opening book builder.
+
+    python -m lib.book.build --sizes 11 --depth 3 --seconds 5 opening.book
+
+Searches every opening position for each board size and writes the
+book the agent maps at start up.
+"""
+import argparse
+import time
+from lib.board.bitboard import Bitboard
+from lib.book.opening import write_book
+from lib.colors import ColorsEnum, get_oposing_color
+from lib.mcts.search import MonteCarloTreeSearch
+from lib.minimax.algo import SearchContext, get_root_moves, iterative_deepening
+from lib.minimax.ordering import MoveOrdering
+from lib.minimax.transposition import TranspositionTable
+
+MAX_SEARCH_DEPTH = 20
+
+
+class BookBuilder:
+    """Builds the book of one board size. Red's first move and the swap
+    table come from MCTS win rates, which separate opening moves much
+    better than the shortest path evaluation: Blue swaps whenever Red's
+    opening wins more than half its playouts, and Red opens with the
+    move closest to even. Every other book move is a timed minimax
+    search, as the agent would play it.
+    """
+
+    def __init__(self, size, depth, seconds, swap_seconds, verbose=False):
+        self.size = size
+        self.depth = depth
+        self.seconds = seconds
+        self.swap_seconds = swap_seconds
+        self.verbose = verbose
+        self.table = TranspositionTable(64)
+        self.ordering = MoveOrdering()
+        self.moves = {}
+
+    def search(self, board, color):
+        self.table.new_search()
+        self.ordering.new_search()
+        deadline = time.monotonic() + self.seconds
+        context = SearchContext(table=self.table, ordering=self.ordering, deadline=deadline)
+        best_move, _, _ = iterative_deepening(
+            board, get_root_moves(board, color), color, deadline,
+            MAX_SEARCH_DEPTH, context)
+        return best_move
+
+    def opening_win_rates(self, board):
+        'Red win rate of each first move, by cell.'
+        rates = []
+        for move in board.free_moves():
+            board.play(move, ColorsEnum.RED)
+            deadline = time.monotonic() + self.swap_seconds
+            _, blue_rate, _ = MonteCarloTreeSearch(seed=len(rates)).search(
+                board, ColorsEnum.BLUE, deadline)
+            board.undo()
+            rates.append(1 - blue_rate)
+        return rates
+
+    def add_lines(self, board, color, ours):
+        """Stores our move in every position with fewer than depth stones
+        reachable from here, following our book moves and every reply.
+        """
+        stones = bin(board.red | board.blue).count("1")
+        if stones >= self.depth or board.winner() != ColorsEnum.FREE:
+            return
+        if color == ours:
+            move = self.search(board, color)
+            self.moves[(board.hash, color)] = move.i * self.size + move.j
+            if self.verbose:
+                print(f"{self.size}x{self.size} {len(self.moves)} positions")
+            moves = [move]
+        else:
+            moves = board.free_moves()
+        for move in moves:
+            board.play(move, color)
+            self.add_lines(board, get_oposing_color(color), ours)
+            board.undo()
+
+    def build(self):
+        'Returns (swap, moves) as write_book takes them.'
+        board = Bitboard(self.size)
+        board.track_connections()
+        rates = self.opening_win_rates(board)
+        swap = [rate > 0.5 for rate in rates]
+
+        if self.depth > 0:
+            first = min(range(len(rates)), key=lambda cell: abs(rates[cell] - 0.5))
+            self.moves[(board.hash, ColorsEnum.RED)] = first
+            board.play(board.move_at(first), ColorsEnum.RED)
+            self.add_lines(board, ColorsEnum.BLUE, ColorsEnum.RED)
+            board.undo()
+
+        for move in board.free_moves():
+            board.play(move, ColorsEnum.RED)
+            # After a swap we own Red's stone and the opponent moves
+            ours = ColorsEnum.RED if swap[move.i * self.size + move.j] else ColorsEnum.BLUE
+            self.add_lines(board, ColorsEnum.BLUE, ours)
+            board.undo()
+        return swap, self.moves
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", nargs="?", default="opening.book")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[11])
+    parser.add_argument(
+        "--depth", type=int, default=2,
+        help="book every position with fewer stones than this")
+    parser.add_argument(
+        "--seconds", type=float, default=5, help="minimax time per position")
+    parser.add_argument(
+        "--swap-seconds", type=float, default=2, help="MCTS time per opening move")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    sections = {}
+    for size in args.sizes:
+        builder = BookBuilder(
+            size, args.depth, args.seconds, args.swap_seconds, args.verbose)
+        sections[size] = builder.build()
+    write_book(args.output, sections)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import mmap
+import os
+import struct
+from lib.board.bitboard import get_zobrist_keys
+from lib.colors import ColorsEnum
+
+MAGIC = b"HXOB"
+VERSION = 1
+# magic, version, number of board sizes
+HEADER = struct.Struct("<4sHH")
+# board size, Zobrist fingerprint, swap table offset, move table offset, slots
+SECTION = struct.Struct("<HQIII")
+# position hash, cell, colour to move (FREE marks an empty slot)
+SLOT = struct.Struct("<QHBx")
+
+
+def get_fingerprint(size):
+    """Ties a section to the Zobrist keys it was built with; a book built
+    with other keys is ignored rather than misread.
+    """
+    red_keys, blue_keys = get_zobrist_keys(size)
+    return red_keys[0] ^ blue_keys[-1]
+
+
+def get_slot_count(entries):
+    'A power of two at least twice the entries, so probes stay short.'
+    slots = 1
+    while slots < 2 * entries:
+        slots *= 2
+    return slots
+
+
+def write_book(path, sections):
+    """Writes a book file. sections maps a board size to (swap, moves):
+    swap is one bool per cell for Red's first move, moves maps
+    (position hash, colour to move) to the cell to play.
+    """
+    header_size = HEADER.size + SECTION.size * len(sections)
+    directory = []
+    body = bytearray()
+    for size, (swap, moves) in sorted(sections.items()):
+        swap_offset = header_size + len(body)
+        body += bytes(1 if cell else 0 for cell in swap)
+        slots = get_slot_count(len(moves))
+        table = bytearray(SLOT.size * slots)
+        for (position_hash, color), cell in moves.items():
+            slot = position_hash & (slots - 1)
+            while SLOT.unpack_from(table, slot * SLOT.size)[2] != ColorsEnum.FREE:
+                slot = (slot + 1) & (slots - 1)
+            SLOT.pack_into(table, slot * SLOT.size, position_hash, cell, color)
+        table_offset = header_size + len(body)
+        body += table
+        directory.append(SECTION.pack(
+            size, get_fingerprint(size), swap_offset, table_offset, slots))
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(sections)))
+        for section in directory:
+            file.write(section)
+        file.write(body)
+
+
+class OpeningBook:
+    """Read-only view of one board size of a book file, mapped into memory
+    so a lookup is a hash probe into the page cache, with no parsing at
+    load time. Positions are keyed by Bitboard.hash and the colour to
+    move.
+    """
+
+    def __init__(self, path, size):
+        self.size = size
+        with open(path, "rb") as file:
+            self.memory = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self.memory, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+        self.swap_offset = None
+        for number in range(count):
+            section_size, fingerprint, swap_offset, table_offset, slots = (
+                SECTION.unpack_from(self.memory, HEADER.size + number * SECTION.size))
+            if section_size == size and fingerprint == get_fingerprint(size):
+                self.swap_offset = swap_offset
+                self.table_offset = table_offset
+                self.slots = slots
+        if self.swap_offset is None:
+            raise ValueError(f"{path} has no book for size {size}")
+
+    def should_swap(self, move):
+        'Whether to swap after Red opens with this move.'
+        return self.memory[self.swap_offset + move.i * self.size + move.j] == 1
+
+    def get_move(self, board, color):
+        'The book move for the colour in this position, or None.'
+        slot = board.hash & (self.slots - 1)
+        while True:
+            position_hash, cell, slot_color = SLOT.unpack_from(
+                self.memory, self.table_offset + slot * SLOT.size)
+            if slot_color == ColorsEnum.FREE:
+                return None
+            if position_hash == board.hash and slot_color == color:
+                move = board.move_at(cell)
+                return move if board.is_free(move) else None
+            slot = (slot + 1) & (self.slots - 1)
+
+    def close(self):
+        self.memory.close()
+
+
+def load_book(path, size):
+    'The opening book for the size, or None if there is no usable one.'
+    if not os.path.exists(path):
+        return None
+    try:
+        return OpeningBook(path, size)
+    except ValueError:
+        return None
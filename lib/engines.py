@@ -0,0 +1,8 @@
+import enum
+
+
+class EnginesEnum(enum.IntEnum):
+    SERIAL = 1
+    ROOT_PARALLEL = 2
+    LAZY_SMP = 3
+    MCTS = 4
@@ -0,0 +1,90 @@
+import dataclasses
+from typing import Any
+from lib.colors import ColorsEnum
+
+
+@dataclasses.dataclass
+class BatchResult:
+    """Outcome of a batch of playouts from one position. Per-cell arrays
+    are indexed by cell: how many playouts gave the cell to each colour
+    and how many of those the colour went on to win.
+    """
+    playouts: int
+    red_wins: int
+    red_cells: Any
+    red_cell_wins: Any
+    blue_cells: Any
+    blue_cell_wins: Any
+
+    def wins(self, color):
+        if color == ColorsEnum.RED:
+            return self.red_wins
+        return self.playouts - self.red_wins
+
+    def cells(self, color):
+        if color == ColorsEnum.RED:
+            return self.red_cells, self.red_cell_wins
+        return self.blue_cells, self.blue_cell_wins
+
+
+def red_connected(red):
+    """Vectorised flood fill over a (playouts, size, size) boolean array
+    of Red stones: grows every board's region from the first row one step
+    at a time until nothing changes, then checks the last row.
+    """
+    import numpy as np
+
+    reach = np.zeros_like(red)
+    reach[:, 0, :] = red[:, 0, :]
+    while True:
+        grown = reach.copy()
+        grown[:, :, 1:] |= reach[:, :, :-1]
+        grown[:, :, :-1] |= reach[:, :, 1:]
+        grown[:, 1:, :] |= reach[:, :-1, :]
+        grown[:, :-1, :] |= reach[:, 1:, :]
+        grown[:, 1:, :-1] |= reach[:, :-1, 1:]
+        grown[:, :-1, 1:] |= reach[:, 1:, :-1]
+        grown &= red
+        if np.array_equal(grown, reach):
+            return reach[:, -1, :].any(axis=1)
+        reach = grown
+
+
+def batch_playouts(board, color, playouts, rng=None):
+    """Runs the given number of random playouts at once with NumPy: every
+    board is filled by a random permutation of the free cells (the side
+    to move gets the first half) and judged by one connectivity check.
+    NumPy is only needed when this is called.
+    """
+    import numpy as np
+
+    if rng is None:
+        rng = np.random.default_rng()
+    size = board.size
+    cells = size * size
+    red_stones = np.array([board.red >> cell & 1 for cell in range(cells)], dtype=bool)
+    blue_stones = np.array([board.blue >> cell & 1 for cell in range(cells)], dtype=bool)
+    free = np.flatnonzero(~(red_stones | blue_stones))
+
+    # Position of each free cell in a random move order; the mover plays
+    # the even moves, so it gets the first half of the positions
+    ranks = rng.permuted(
+        np.tile(np.arange(len(free)), (playouts, 1)), axis=1)
+    own = ranks < (len(free) + 1) // 2
+    red = np.broadcast_to(red_stones, (playouts, cells)).copy()
+    if color == ColorsEnum.RED:
+        red[:, free] = own
+    else:
+        red[:, free] = ~own
+
+    won = red_connected(red.reshape(playouts, size, size))
+    blue = ~red
+    return BatchResult(
+        playouts=playouts,
+        red_wins=int(won.sum()),
+        red_cells=red.sum(axis=0),
+        red_cell_wins=red[won].sum(axis=0),
+        blue_cells=blue.sum(axis=0),
+        blue_cell_wins=blue[~won].sum(axis=0),
+    )
+
@@ -0,0 +1,32 @@
+import functools
+import random
+from lib.colors import ColorsEnum
+
+
+@functools.lru_cache(maxsize=None)
+def get_cell_bits(size):
+    return tuple(1 << cell for cell in range(size * size))
+
+
+def random_fill(board, free_cells, color, rng=random):
+    """Plays the free cells in random order, alternating colours starting
+    with the given one, and returns the final (red, blue) masks. A full
+    Hex board always has exactly one winner, so the order of the moves
+    does not matter, only who got which cell.
+    """
+    cells = list(free_cells)
+    rng.shuffle(cells)
+    bits = get_cell_bits(board.size)
+    own = sum(map(bits.__getitem__, cells[0::2]))
+    other = sum(map(bits.__getitem__, cells[1::2]))
+    if color == ColorsEnum.RED:
+        return board.red | own, board.blue | other
+    return board.red | other, board.blue | own
+
+
+def full_board_winner(board, red):
+    'Winner of a completely filled board, given its Red stones.'
+    start, end = board.get_edges(ColorsEnum.RED)
+    if board.flood(start & red, red) & end:
+        return ColorsEnum.RED
+    return ColorsEnum.BLUE
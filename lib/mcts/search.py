@@ -0,0 +1,237 @@
+import math
+import random
+import time
+from lib.colors import ColorsEnum, get_oposing_color
+from lib.mcts.tree import NodeStore
+from lib.mcts.playout import random_fill, full_board_winner
+from lib.mcts.batch import batch_playouts
+
+MAX_NODES = 500_000
+EXPLORATION = 0.3
+# Visits after which a move's own statistics weigh as much as its AMAF ones
+RAVE_EQUIVALENCE = 300
+# Value of a move without any statistics, above every real win rate
+FIRST_PLAY_URGENCY = 1.1
+# A leaf is expanded on its second visit
+EXPAND_VISITS = 1
+
+
+class MonteCarloTreeSearch:
+    """UCT search with optional RAVE. Each iteration walks down the tree
+    on a board that tracks connections (so finished games are seen
+    without a playout), expands one leaf, fills the rest of the board at
+    random and counts the result for every node on the way. The tree is
+    kept between moves: when the next search starts from a position two
+    plies further down, the matching subtree becomes the new root.
+    With a batch size, every leaf is scored by that many NumPy playouts
+    at once (see batch_playouts) instead of a single one.
+    """
+
+    def __init__(self, max_nodes=MAX_NODES, exploration=EXPLORATION, rave=True,
+                 seed=None, batch=0):
+        self.max_nodes = max_nodes
+        self.exploration = exploration
+        self.rave = rave
+        self.batch = batch
+        self.rng = random.Random(seed)
+        self.batch_rng = None
+        if batch:
+            import numpy as np
+            self.batch_rng = np.random.default_rng(seed)
+        self.store = None
+        self.root = 0
+        self.root_red = 0
+        self.root_blue = 0
+        self.root_color = ColorsEnum.FREE
+        self.size = 0
+
+    def reset(self, board, color):
+        self.store = NodeStore(self.max_nodes)
+        self.root = self.store.add(-1, -1)
+        self.set_root(board, color)
+
+    def set_root(self, board, color):
+        self.size = board.size
+        self.root_red = board.red
+        self.root_blue = board.blue
+        self.root_color = color
+
+    def advance(self, board, color):
+        """Moves the root to the node of the given position if it follows
+        from the current root by one stone at a time, alternating colours.
+        Returns False (and leaves the tree alone) otherwise.
+        """
+        if self.store is None or board.size != self.size:
+            return False
+        if self.root_red & ~board.red or self.root_blue & ~board.blue:
+            return False
+        added = {
+            ColorsEnum.RED: board.red & ~self.root_red,
+            ColorsEnum.BLUE: board.blue & ~self.root_blue,
+        }
+        node = self.root
+        mover = self.root_color
+        while added[ColorsEnum.RED] or added[ColorsEnum.BLUE]:
+            stone = added[mover]
+            if not stone or stone & (stone - 1):
+                return False
+            node = self.store.child(node, stone.bit_length() - 1)
+            if node is None:
+                return False
+            added[mover] = 0
+            mover = get_oposing_color(mover)
+        if mover != color:
+            return False
+
+        if len(self.store) > self.max_nodes // 2:
+            self.store = self.store.subtree(node)
+            node = 0
+        self.root = node
+        self.set_root(board, color)
+        return True
+
+    def search(self, board, color, deadline=None, max_playouts=None, stop=None):
+        """Runs playouts until the deadline (a time.monotonic() value),
+        the playout limit or the stop flag, whichever comes first, and
+        returns (best_move, win_rate, playouts) for the most visited move.
+        """
+        if not self.advance(board, color):
+            self.reset(board, color)
+        search_board = board.copy()
+        search_board.track_connections()
+        free_cells = [
+            cell for cell in range(board.size * board.size)
+            if not (board.red | board.blue) >> cell & 1
+        ]
+
+        playouts = 0
+        while playouts == 0 or (
+                (max_playouts is None or playouts < max_playouts)
+                and (deadline is None or time.monotonic() < deadline)
+                and (stop is None or not stop.is_set())):
+            playouts += self.iterate(search_board, free_cells)
+
+        best = self.best_child(self.root)
+        store = self.store
+        win_rate = store.wins[best] / store.visits[best] if store.visits[best] else 0
+        return board.move_at(store.cell[best]), win_rate, playouts
+
+    def best_child(self, node):
+        'The most visited child, the one with more wins on ties.'
+        store = self.store
+        return max(
+            store.children(node),
+            key=lambda child: (store.visits[child], store.wins[child]))
+
+    def select_child(self, node):
+        store = self.store
+        visits = store.visits
+        wins = store.wins
+        rave_visits = store.rave_visits
+        rave_wins = store.rave_wins
+        log_visits = math.log(max(visits[node], 1))
+
+        best = None
+        best_value = float("-inf")
+        for child in store.children(node):
+            child_visits = visits[child]
+            if child_visits:
+                value = wins[child] / child_visits
+            else:
+                value = FIRST_PLAY_URGENCY
+            if self.rave and rave_visits[child]:
+                amaf_visits = rave_visits[child]
+                beta = amaf_visits / (
+                    amaf_visits + child_visits
+                    + child_visits * amaf_visits / RAVE_EQUIVALENCE)
+                value = (1 - beta) * value + beta * rave_wins[child] / amaf_visits
+            value += self.exploration * math.sqrt(log_visits / (child_visits + 1))
+            if value > best_value:
+                best = child
+                best_value = value
+        return best
+
+    def iterate(self, board, free_cells):
+        """One selection, expansion, playout and update. Returns the
+        number of playouts it ran.
+        """
+        store = self.store
+        node = self.root
+        mover = self.root_color
+        path = [node]
+        winner = ColorsEnum.FREE
+
+        while True:
+            if not store.is_expanded(node):
+                if node != self.root and store.visits[node] < EXPAND_VISITS:
+                    break
+                if store.is_full():
+                    break
+                taken = board.red | board.blue
+                cells = [cell for cell in free_cells if not taken >> cell & 1]
+                self.rng.shuffle(cells)
+                store.expand(node, cells)
+            if not store.child_count[node]:
+                break
+            node = self.select_child(node)
+            board.play(board.move_at(store.cell[node]), mover)
+            path.append(node)
+            mover = get_oposing_color(mover)
+            winner = board.winner()
+            if winner != ColorsEnum.FREE:
+                break
+
+        playouts = max(self.batch, 1)
+        if winner != ColorsEnum.FREE:
+            self.update(path, winner, board.red, board.blue, playouts)
+        elif self.batch:
+            self.update_batch(path, batch_playouts(
+                board, mover, self.batch, self.batch_rng))
+        else:
+            taken = board.red | board.blue
+            cells = [cell for cell in free_cells if not taken >> cell & 1]
+            red, blue = random_fill(board, cells, mover, self.rng)
+            self.update(path, full_board_winner(board, red), red, blue)
+
+        for _ in range(len(path) - 1):
+            board.undo()
+        return playouts
+
+    def update(self, path, winner, red, blue, weight=1):
+        'Counts one playout, weight times, for every node of the path.'
+        store = self.store
+        to_move = self.root_color
+        for node in path:
+            # wins belong to the player who made the move into this node
+            store.visits[node] += weight
+            if winner != to_move:
+                store.wins[node] += weight
+            if self.rave:
+                won = winner == to_move
+                stones = red if to_move == ColorsEnum.RED else blue
+                cells = store.cell
+                for child in store.children(node):
+                    if stones >> cells[child] & 1:
+                        store.rave_visits[child] += weight
+                        if won:
+                            store.rave_wins[child] += weight
+            to_move = get_oposing_color(to_move)
+
+    def update_batch(self, path, result):
+        store = self.store
+        to_move = self.root_color
+        cell_stats = {
+            color: [stats.tolist() for stats in result.cells(color)]
+            for color in (ColorsEnum.RED, ColorsEnum.BLUE)
+        }
+        for node in path:
+            store.visits[node] += result.playouts
+            store.wins[node] += result.wins(get_oposing_color(to_move))
+            if self.rave:
+                counts, wins = cell_stats[to_move]
+                cells = store.cell
+                for child in store.children(node):
+                    cell = cells[child]
+                    store.rave_visits[child] += counts[cell]
+                    store.rave_wins[child] += wins[cell]
+            to_move = get_oposing_color(to_move)
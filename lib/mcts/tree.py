@@ -0,0 +1,95 @@
+from array import array
+
+UNEXPANDED = -1
+
+
+class NodeStore:
+    """Search tree kept as parallel arrays indexed by node number instead
+    of one object per node. The children of a node are allocated next to
+    each other, so a node only needs its first child and a child count.
+    wins are counted for the player who played the node's move; the rave_
+    fields hold the all-moves-as-first statistics of that move.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.cell = array("i")
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.child_count = array("i")
+        self.visits = array("i")
+        self.wins = array("i")
+        self.rave_visits = array("i")
+        self.rave_wins = array("i")
+
+    def __len__(self):
+        return len(self.cell)
+
+    def is_full(self):
+        return len(self.cell) >= self.capacity
+
+    def add(self, cell, parent):
+        self.cell.append(cell)
+        self.parent.append(parent)
+        self.first_child.append(0)
+        self.child_count.append(UNEXPANDED)
+        self.visits.append(0)
+        self.wins.append(0)
+        self.rave_visits.append(0)
+        self.rave_wins.append(0)
+        return len(self.cell) - 1
+
+    def expand(self, node, cells):
+        'Adds one child per cell, returns the index of the first one.'
+        first = len(self.cell)
+        count = len(cells)
+        self.cell.extend(cells)
+        self.parent.extend([node] * count)
+        self.first_child.extend([0] * count)
+        self.child_count.extend([UNEXPANDED] * count)
+        for field in (self.visits, self.wins, self.rave_visits, self.rave_wins):
+            field.extend([0] * count)
+        self.first_child[node] = first
+        self.child_count[node] = count
+        return first
+
+    def is_expanded(self, node):
+        return self.child_count[node] != UNEXPANDED
+
+    def children(self, node):
+        if self.child_count[node] <= 0:
+            return range(0)
+        first = self.first_child[node]
+        return range(first, first + self.child_count[node])
+
+    def child(self, node, cell):
+        for child in self.children(node):
+            if self.cell[child] == cell:
+                return child
+        return None
+
+    def subtree(self, root):
+        """A new store holding only the subtree of the given node, with
+        that node at index 0. Drops every node the game can no longer
+        reach.
+        """
+        store = NodeStore(self.capacity)
+        store.add(self.cell[root], -1)
+        self.copy_stats(root, store, 0)
+        pending = [(root, 0)]
+        while pending:
+            node, copy = pending.pop()
+            if not self.is_expanded(node):
+                continue
+            children = self.children(node)
+            first = store.expand(copy, [self.cell[child] for child in children])
+            for offset, child in enumerate(children):
+                self.copy_stats(child, store, first + offset)
+                pending.append((child, first + offset))
+        return store
+
+    def copy_stats(self, node, store, copy):
+        store.visits[copy] = self.visits[node]
+        store.wins[copy] = self.wins[node]
+        store.rave_visits[copy] = self.rave_visits[node]
+        store.rave_wins[copy] = self.rave_wins[node]
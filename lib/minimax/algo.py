@@ -1,51 +1,274 @@
-from lib.minimax.eval import evaluation, board_states, collapse_board
+import dataclasses
+import time
+from typing import Any, Optional
+from lib.minimax.eval import evaluation
+from lib.minimax.transposition import BoundsEnum, search_key
 from lib.board.moves import get_possible_moves, get_active_moves
 from lib.board.move_algos import get_active_moves_path
-import copy
-from lib.colors import get_oposing_color
+from lib.colors import ColorsEnum, get_oposing_color
 
+# How many nodes are searched between two clock reads
+CHECK_EVERY_NODES = 64
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class SearchContext:
+    """State shared by every node of one search: the transposition table,
+    the move ordering, the leaf evaluator (evaluation if None), the
+    deadline (a time.monotonic() value), an optional stop flag (any
+    object with is_set(), e.g. threading.Event), node counts and optional
+    telemetry counters (a SearchStats).
+    """
+    table: Any = None
+    ordering: Any = None
+    evaluator: Any = None
+    deadline: Optional[float] = None
+    stop: Any = None
+    nodes: int = 0
+    stats: Any = None
+
+    def evaluate(self, board, color):
+        stats = self.stats
+        if stats is not None:
+            start = time.perf_counter()
+        if self.evaluator is None:
+            score = evaluation(board, color)
+        else:
+            score = self.evaluator(board, color)
+        if stats is not None:
+            stats.evaluations += 1
+            stats.evaluation_seconds += time.perf_counter() - start
+        return score
+
+    def visit(self):
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY_NODES == 0:
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                raise SearchTimeout()
+            if self.stop is not None and self.stop.is_set():
+                raise SearchTimeout()
+
+
+def get_winning_move(board, color):
+    'A move that connects the colour right away, or None.'
+    if board.connection_distance(color, virtual=False) != 1:
+        return None
+    for move in board.free_moves():
+        board.play(move, color)
+        winner = board.winner()
+        board.undo()
+        if winner == color:
+            return move
+    return None
+
+
+def get_root_moves(board, color):
+    """Candidate moves for the side to play: an immediate win if there is
+    one, else the cells on both shortest paths, else every free cell.
+    """
+    winning_move = get_winning_move(board, color)
+    if winning_move:
+        return [winning_move]
+    # moves = get_active_moves(board)
+    moves = get_active_moves_path(board)
+    if not moves:
+        moves = get_possible_moves(board)
+    return moves
+
+
+def minimax(board, depth, isMaximizingPlayer, maximixing_color, alpha, beta, context=None):
+    if context is None:
+        context = SearchContext()
+    context.visit()
+    table = context.table
+    stats = context.stats
+
+    winner = board.winner()
+    if winner != ColorsEnum.FREE:
+        return float("inf") if winner == maximixing_color else float("-inf")
+
+    key = None
+    hash_move = None
+    if table is not None:
+        key = search_key(board, isMaximizingPlayer, maximixing_color)
+        entry = table.probe(key)
+        if stats is not None:
+            if entry:
+                stats.table_hits += 1
+            else:
+                stats.table_misses += 1
+        if entry and entry[3] >= 0:
+            hash_move = board.move_at(entry[3])
+        if entry and entry[1] >= depth:
+            score, _, bound, _ = entry
+            if bound == BoundsEnum.EXACT:
+                return score
+            if bound == BoundsEnum.LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
 
-def minimax(board, depth, isMaximizingPlayer, maximixing_color, alpha, beta):
     if depth == 0:
-        return evaluation(copy.deepcopy(board), maximixing_color)
+        score = context.evaluate(board, maximixing_color)
+        if table is not None:
+            table.store(key, score, 0, BoundsEnum.EXACT)
+        return score
 
+    if stats is not None:
+        start = time.perf_counter()
     # moves = get_active_moves(board)
     # moves = get_possible_moves(board)
-    moves = get_active_moves_path(copy.deepcopy(board))
+    moves = get_active_moves_path(board)
 
-    if moves:
+    if not moves:
+        score = context.evaluate(board, maximixing_color)
+        if table is not None:
+            table.store(key, score, depth, BoundsEnum.EXACT)
+        return score
+
+    ordering = context.ordering
+    if isMaximizingPlayer:
+        color = maximixing_color
+    else:
+        color = get_oposing_color(maximixing_color)
+    if ordering is not None:
+        moves = ordering.order(board, moves, color, hash_move)
+    if stats is not None:
+        stats.move_generation_seconds += time.perf_counter() - start
+
+    alpha_start, beta_start = alpha, beta
+    bestMove = moves[0]
+    evaluate_children = getattr(context.evaluator, "evaluate_children", None)
+    if depth == 1 and evaluate_children is not None:
+        # Every child is a leaf: score them all in one call
+        if stats is not None:
+            start = time.perf_counter()
+        scores = evaluate_children(board, moves, color, maximixing_color)
+        if stats is not None:
+            stats.evaluations += len(moves)
+            stats.evaluation_seconds += time.perf_counter() - start
+        for index, move in enumerate(moves):
+            context.visit()
+            board.play(move, color)
+            if board.winner() != ColorsEnum.FREE:
+                scores[index] = float("inf") if isMaximizingPlayer else float("-inf")
+            board.undo()
         if isMaximizingPlayer:
-            bestValue = float("-inf")
-            for move in moves:
-                updated_board = copy.deepcopy(board)
-                updated_board[move.i][move.j] = maximixing_color
-                bestValue = max(
-                    bestValue,
-                    minimax(
-                        updated_board, depth - 1, False, maximixing_color, alpha, beta
-                    ),
-                )
-                if bestValue >= beta:
-                    break
-                alpha = max(alpha, bestValue)
-
-            return bestValue
+            bestValue = max(scores)
         else:
-            bestValue = float("inf")
-            opponent_color = get_oposing_color(maximixing_color)
-            for move in moves:
-                updated_board = copy.deepcopy(board)
-                updated_board[move.i][move.j] = opponent_color
-                bestValue = min(
-                    bestValue,
-                    minimax(
-                        updated_board, depth - 1, True, maximixing_color, alpha, beta
-                    ),
-                )
-                if bestValue <= alpha:
-                    break
-                beta = min(beta, bestValue)
-
-            return bestValue
+            bestValue = min(scores)
+        bestMove = moves[scores.index(bestValue)]
+        if bestValue >= beta if isMaximizingPlayer else bestValue <= alpha:
+            if stats is not None:
+                stats.cutoffs += 1
+            if ordering is not None:
+                ordering.cutoff(board, bestMove, color, depth)
+    elif isMaximizingPlayer:
+        bestValue = float("-inf")
+        for move in moves:
+            board.play(move, color)
+            value = minimax(
+                board, depth - 1, False, maximixing_color, alpha, beta, context
+            )
+            board.undo()
+            if value > bestValue:
+                bestValue = value
+                bestMove = move
+            if bestValue >= beta:
+                if stats is not None:
+                    stats.cutoffs += 1
+                if ordering is not None:
+                    ordering.cutoff(board, move, color, depth)
+                break
+            alpha = max(alpha, bestValue)
     else:
-        return evaluation(board, maximixing_color)
+        bestValue = float("inf")
+        for move in moves:
+            board.play(move, color)
+            value = minimax(
+                board, depth - 1, True, maximixing_color, alpha, beta, context
+            )
+            board.undo()
+            if value < bestValue:
+                bestValue = value
+                bestMove = move
+            if bestValue <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
+                if ordering is not None:
+                    ordering.cutoff(board, move, color, depth)
+                break
+            beta = min(beta, bestValue)
+
+    if table is not None:
+        if bestValue <= alpha_start:
+            bound = BoundsEnum.UPPER
+        elif bestValue >= beta_start:
+            bound = BoundsEnum.LOWER
+        else:
+            bound = BoundsEnum.EXACT
+        table.store(key, bestValue, depth, bound,
+                    bestMove.i * board.size + bestMove.j)
+    return bestValue
+
+
+def search_root(board, moves, depth, color, context):
+    """Scores every root move with a (depth + 1) ply search and returns
+    (best_move, best_score).
+    """
+    best_move = None
+    best_score = float("-inf")
+    for move in moves:
+        board.play(move, color)
+        score = minimax(
+            board, depth, False, color, best_score, float("inf"), context
+        )
+        board.undo()
+        if best_move is None or score > best_score:
+            best_move = move
+            best_score = score
+        if best_score == float("inf"):
+            break
+    return best_move, best_score
+
+
+def iterative_deepening(board, moves, color, deadline, max_depth, context=None,
+                        root_search=search_root, min_depth=0):
+    """Searches 1, 2, 3... plies deep until the deadline and returns
+    (best_move, best_score, plies) from the deepest iteration that
+    finished. An iteration running over the deadline is abandoned mid-tree
+    and the board is rolled back to where the search started.
+    root_search scores one iteration, see search_root. min_depth skips
+    the shallow iterations.
+    """
+    if context is None:
+        context = SearchContext()
+    context.deadline = deadline
+    start = time.monotonic()
+    history_length = len(board.history)
+
+    best_move, best_score, plies = moves[0], float("-inf"), 0
+    for depth in range(min(min_depth, max_depth - 1), max_depth):
+        try:
+            move, score = root_search(board, moves, depth, color, context)
+        except SearchTimeout:
+            while len(board.history) > history_length:
+                board.undo()
+            break
+
+        best_move, best_score, plies = move, score, depth + 1
+        if abs(best_score) == float("inf"):
+            break
+        # Search the previous best move first in the next iteration
+        moves = [best_move] + [other for other in moves if other != best_move]
+        # The next iteration takes several times longer than all before it
+        if deadline is not None and time.monotonic() - start > (deadline - start) / 2:
+            break
+
+    return best_move, best_score, plies
@@ -1,93 +1,63 @@
+import enum
 import random
+from collections import defaultdict
 from lib.board.graph import Graph
+from lib.board.array_graph import ArrayGraph
 from lib.board.sides import get_sides_for_color
 from lib.colors import ColorsEnum, get_oposing_color, int_color_to_char
 from lib.board.print_board import print_board
-from collections import defaultdict
 
-board_states = {}
-verbose = False
 
+class PathAlgorithmsEnum(enum.IntEnum):
+    BITBOARD = 1
+    BFS_01 = 2
+    ASTAR = 3
+    DEPTH = 4
 
-def collapse_board(board):
-    collaped = ""
-    for row in board:
-        for h in row:
-            collaped += int_color_to_char(h)
-    return collaped
 
+PATH_ALGORITHM = PathAlgorithmsEnum.BITBOARD
 
-def get_score(graph, board, player_color):
+
+def get_graph_score(graph, player_color):
     player_sides = get_sides_for_color(player_color)
-    if verbose:
-        print()
-        print(player_color)
-        print(player_sides)
+    graph.set_player_color(player_color)
+    start = graph.sides[player_sides[1]]
+    end = graph.sides[player_sides[0]]
 
-    # graph.make_shortest_path(
-    #     graph.sides[player_sides[1]], graph.sides[player_sides[0]]
-    # )
-    # shortest_path = graph.sides[player_sides[0]].distance_from_start
+    if PATH_ALGORITHM == PathAlgorithmsEnum.BFS_01:
+        return graph.make_shortest_path_01bfs(start, end)
 
-    # return shortest_path - 1
+    if PATH_ALGORITHM == PathAlgorithmsEnum.ASTAR:
+        path = graph.make_shortest_path_astar(start, end)
+        if not path:
+            return float("inf")
+        return len([hax for hax in path if hax.color == ColorsEnum.FREE])
 
+    graph.min_path_distance = float("inf")
     visited = defaultdict(lambda: False)
-    visited[graph.sides[player_sides[1]].move] = True
-    length = graph.make_shortest_path_by_depth(
-        graph.sides[player_sides[1]], graph.sides[player_sides[0]], visited=visited)
-    if verbose:
-        print(
-            f"Path length for {int_color_to_char(graph.player_color)} {length}")
-    return length
+    visited[start.move] = True
+    return graph.make_shortest_path_by_depth(start, end, visited=visited)
 
-    # path = graph.make_shortest_path_astar(
-    #     graph.sides[player_sides[1]], graph.sides[player_sides[0]])
 
-    # if not path:
-    #     return float("inf")
-
-    # moves_to_complete = 0
-    # for hax in path:
-    #     if hax.color == ColorsEnum.FREE:
-    #         moves_to_complete += 1
-    #         # print("Hello Horia!")
-
-    # return moves_to_complete
+def get_score(board, player_color, graph=None):
+    if graph is None:
+        length = board.connection_distance(player_color)
+    else:
+        length = get_graph_score(graph, player_color)
+    return length
 
 
 def evaluation(board, player_color):
-    if verbose:
-        print("BEGIN EVAL")
-        print(player_color)
-        print_board(board)
-
-    global board_states
-    collapsed_board = collapse_board(board)
+    game_graph = None
+    if PATH_ALGORITHM == PathAlgorithmsEnum.DEPTH:
+        game_graph = Graph(board, player_color)
+    elif PATH_ALGORITHM != PathAlgorithmsEnum.BITBOARD:
+        game_graph = ArrayGraph(board, player_color)
 
-    if collapsed_board in board_states:
-        if verbose:
-            print("\nused cached board\n")
-        return board_states[collapsed_board]
-
-    game_graph = Graph(board, player_color)
-
-    player_score = get_score(game_graph, board, player_color)
-
-    # game_graph.clear_graph()
-    game_graph.min_path_distance = float("inf")
+    player_score = get_score(board, player_color, game_graph)
 
     oposing_color = get_oposing_color(player_color)
 
-    game_graph.set_player_color(oposing_color)
-
-    oposing_score = get_score(game_graph, board, oposing_color)
-
-    del game_graph
-
-    if verbose:
-        print(oposing_score - player_score)
-        print(f"BOARD SCORE {oposing_score - player_score}")
-
-    board_states[collapsed_board] = oposing_score - player_score
+    oposing_score = get_score(board, oposing_color, game_graph)
 
     return oposing_score - player_score
@@ -0,0 +1,187 @@
+import hashlib
+import queue
+import sqlite3
+import threading
+import time
+from lib.colors import ColorsEnum
+from lib.minimax.eval import evaluation
+
+# Entries written per transaction, and the longest a new entry waits
+BATCH = 512
+FLUSH_SECONDS = 2.0
+
+
+def rotate(stones, size):
+    """The stones turned half a turn: cell k goes to size*size - 1 - k,
+    which is reversing the bits. Each colour keeps its own sides, so
+    both boards score the same.
+    """
+    cells = size * size
+    return int(format(stones, f"0{cells}b")[::-1], 2)
+
+
+def position_key(name, size, red, blue, color):
+    """Signed 64 bit key of a position, the same for both of its
+    rotations: evaluator name, size and the colour scored are hashed in
+    with the smaller of the two stone layouts.
+    """
+    layout = min((red, blue), (rotate(red, size), rotate(blue, size)))
+    length = (size * size + 7) // 8
+    digest = hashlib.blake2b(
+        b"%s:%d:%d:" % (name.encode("utf-8"), size, color)
+        + layout[0].to_bytes(length, "little") + layout[1].to_bytes(length, "little"),
+        digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class EvaluationCache:
+    """Leaf scores kept in an SQLite file across games.
+
+    A background thread owns the connection: it loads the stored scores
+    into memory when the cache is opened, then writes new and reused
+    entries in batches, so lookups and stores on the search thread only
+    touch a dict and a queue. Scores from before the load finishes are
+    simply recomputed.
+
+    Every entry records the session (one per opening of the file) that
+    last used it. Once the file holds more than max_entries, the least
+    recently used are deleted. Several processes may share a file; SQLite
+    serializes their writes.
+    """
+
+    def __init__(self, path, max_entries=200_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.scores = {}
+        # Keys already marked as used this session
+        self.used = set()
+        self.pending = queue.Queue()
+        self.loaded = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def get(self, key):
+        score = self.scores.get(key)
+        if score is not None and key not in self.used:
+            self.used.add(key)
+            self.pending.put((key, score))
+        return score
+
+    def put(self, key, score):
+        if len(self.scores) < self.max_entries:
+            self.scores[key] = score
+        if len(self.used) >= self.max_entries:
+            self.used.clear()
+        self.used.add(key)
+        self.pending.put((key, score))
+
+    def close(self):
+        'Writes what is still queued and stops the thread.'
+        self.pending.put(None)
+        self.thread.join()
+
+    def run(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            session = self.load(connection)
+            self.loaded.set()
+            done = False
+            while not done:
+                batch, done = self.next_batch()
+                if batch:
+                    self.write(connection, batch, session)
+        finally:
+            self.loaded.set()
+            connection.close()
+
+    def load(self, connection):
+        'Reads the stored scores and returns the number of this session.'
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS scores"
+                " (key INTEGER PRIMARY KEY, score REAL, used INTEGER)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (number INTEGER PRIMARY KEY)")
+            session = connection.execute("INSERT INTO sessions DEFAULT VALUES").lastrowid
+        rows = connection.execute(
+            "SELECT key, score FROM scores ORDER BY used DESC LIMIT ?",
+            (self.max_entries,))
+        for key, score in rows:
+            self.scores.setdefault(key, score)
+        return session
+
+    def next_batch(self):
+        'Waits for up to BATCH entries or FLUSH_SECONDS; true once closed.'
+        batch = {}
+        deadline = time.monotonic() + FLUSH_SECONDS
+        while len(batch) < BATCH:
+            try:
+                entry = self.pending.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if entry is None:
+                return batch, True
+            batch[entry[0]] = entry[1]
+        return batch, False
+
+    def write(self, connection, batch, session):
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?)",
+                [(key, score, session) for key, score in batch.items()])
+            extra = connection.execute("SELECT COUNT(*) FROM scores").fetchone()[0] \
+                - self.max_entries
+            if extra > 0:
+                connection.execute(
+                    "DELETE FROM scores WHERE key IN"
+                    " (SELECT key FROM scores ORDER BY used LIMIT ?)", (extra,))
+
+
+class CachedEvaluator:
+    """A leaf evaluator (evaluation if None) answered from an
+    EvaluationCache where it can. name keeps the scores of different
+    evaluators apart in a shared file. evaluate_children, when the
+    evaluator has it, is only called for the children not in the cache.
+    """
+
+    def __init__(self, evaluator, cache, name):
+        self.evaluator = evaluator
+        self.cache = cache
+        self.name = name
+        if getattr(evaluator, "evaluate_children", None) is None:
+            self.evaluate_children = None
+
+    def __call__(self, board, player_color):
+        key = position_key(self.name, board.size, board.red, board.blue, player_color)
+        score = self.cache.get(key)
+        if score is None:
+            if self.evaluator is None:
+                score = evaluation(board, player_color)
+            else:
+                score = self.evaluator(board, player_color)
+            self.cache.put(key, score)
+        return score
+
+    def evaluate_children(self, board, moves, color, player_color):
+        'Scores of the positions after each move of color, in order.'
+        scores = []
+        missing = []
+        for move in moves:
+            bit = 1 << (move.i * board.size + move.j)
+            if color == ColorsEnum.RED:
+                key = position_key(
+                    self.name, board.size, board.red | bit, board.blue, player_color)
+            else:
+                key = position_key(
+                    self.name, board.size, board.red, board.blue | bit, player_color)
+            score = self.cache.get(key)
+            if score is None:
+                missing.append((len(scores), move, key))
+            scores.append(score)
+        if missing:
+            computed = self.evaluator.evaluate_children(
+                board, [move for _, move, _ in missing], color, player_color)
+            for (index, _, key), score in zip(missing, computed):
+                scores[index] = score
+                self.cache.put(key, score)
+        return scores
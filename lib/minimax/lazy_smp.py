@@ -0,0 +1,118 @@
+import random
+from multiprocessing import shared_memory
+from lib.board.bitboard import Bitboard, Tracking
+from lib.minimax.algo import SearchContext, iterative_deepening
+from lib.minimax.transposition import ENTRY_BYTES, TranspositionTable, table_slots
+from lib.minimax.ordering import MoveOrdering
+
+# The first bytes of the segment hold flags, the table follows
+HEADER_BYTES = 64
+STOP_FLAG = 0
+
+# Per worker process state, set up by init_worker
+worker_shared = None
+worker_evaluator = None
+worker_tracking = None
+
+
+class SharedTable:
+    """A TranspositionTable and a stop flag in one shared memory segment.
+    Created once by the agent; pool workers attach to it by name. The
+    table is lock free: torn writes read as misses (see
+    TranspositionTable).
+    """
+
+    def __init__(self, megabytes, name=None):
+        size = HEADER_BYTES + table_slots(megabytes) * ENTRY_BYTES
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(
+            name=name, create=self.owner, size=size)
+        self.flags = self.memory.buf[:HEADER_BYTES]
+        self.table = TranspositionTable(
+            megabytes, buffer=self.memory.buf[HEADER_BYTES:])
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def is_set(self):
+        return self.flags[STOP_FLAG] == 1
+
+    def set(self):
+        self.flags[STOP_FLAG] = 1
+
+    def clear(self):
+        self.flags[STOP_FLAG] = 0
+
+    def close(self):
+        self.table.release()
+        self.table.buffer.release()
+        self.flags.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def init_worker(name, megabytes, evaluator=None, tracking=Tracking()):
+    global worker_shared, worker_evaluator, worker_tracking
+    worker_shared = SharedTable(megabytes, name)
+    worker_evaluator = evaluator
+    worker_tracking = tracking
+
+
+def helper_search(size, red, blue, moves, color, deadline, max_depth, helper, generation):
+    """Runs in a pool worker: a full iterative deepening search of the
+    root with its own move order, starting one ply deeper on odd helpers.
+    Shares every result through the table; stops when the flag is set.
+    """
+    worker_shared.table.generation = generation
+    board = worker_tracking.apply(Bitboard.from_masks(size, red, blue))
+    moves = list(moves)
+    random.Random(helper).shuffle(moves)
+    context = SearchContext(
+        table=worker_shared.table, ordering=MoveOrdering(),
+        evaluator=worker_evaluator, deadline=deadline, stop=worker_shared)
+    return iterative_deepening(
+        board, moves, color, deadline, max_depth, context, min_depth=helper % 2)
+
+
+class LazySMPSearch:
+    """Lazy SMP: the agent's own iterative deepening runs in this process
+    while every pool worker searches the same root in a different order,
+    all through one shared transposition table. Returns the result of the
+    deepest completed search, preferring the main one on ties.
+    """
+
+    def __init__(self, executor, shared, workers):
+        self.executor = executor
+        self.shared = shared
+        self.workers = workers
+
+    def search(self, board, moves, color, deadline, max_depth, ordering=None,
+               evaluator=None, stats=None, stop=None):
+        self.shared.clear()
+        table = self.shared.table
+        helpers = [
+            self.executor.submit(
+                helper_search, board.size, board.red, board.blue, moves,
+                color, deadline, max_depth, helper, table.generation,
+            )
+            for helper in range(1, self.workers)
+        ]
+
+        context = SearchContext(
+            table=table, ordering=ordering, evaluator=evaluator, stats=stats,
+            stop=stop)
+        results = [iterative_deepening(
+            board, moves, color, deadline, max_depth, context)]
+        if stats is not None:
+            stats.nodes = context.nodes
+        self.shared.set()
+        for helper in helpers:
+            results.append(helper.result())
+
+        best = results[0]
+        for result in results[1:]:
+            if result[2] > best[2]:
+                best = result
+        return best
@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+KILLERS_PER_PLY = 2
+
+
+class MoveOrdering:
+    """Orders the moves of a node so alpha-beta meets cutoffs early:
+    the transposition table move first, then the killer moves that caused
+    a cutoff at the same ply, then by history score (how often and how
+    deep a move caused cutoffs for that colour), then by a static score
+    that prefers the centre of the board. Plies are counted as stones on
+    the board, so killers stay valid across iterations and moves.
+    """
+
+    def __init__(self):
+        self.killers = defaultdict(list)
+        self.history = defaultdict(int)
+
+    def new_search(self):
+        'Forgets killers and halves history scores. Call once per move.'
+        self.killers.clear()
+        for key in list(self.history):
+            self.history[key] //= 2
+            if not self.history[key]:
+                del self.history[key]
+
+    def static_score(self, board, move):
+        centre = (board.size - 1) / 2
+        di = move.i - centre
+        dj = move.j - centre
+        return -(abs(di) + abs(dj) + abs(di + dj))
+
+    def order(self, board, moves, color, hash_move=None):
+        ply = len(board.history)
+        killers = self.killers[ply]
+        history = self.history
+
+        def rank(move):
+            if move == hash_move:
+                return (0, 0, 0)
+            if move in killers:
+                return (1, killers.index(move), 0)
+            return (2, -history[(color, move)], -self.static_score(board, move))
+
+        return sorted(moves, key=rank)
+
+    def cutoff(self, board, move, color, depth):
+        'Records a move that caused a beta (or alpha) cutoff.'
+        killers = self.killers[len(board.history)]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[KILLERS_PER_PLY:]
+        self.history[(color, move)] += depth * depth
@@ -0,0 +1,131 @@
+import concurrent.futures
+import time
+from lib.board.bitboard import Bitboard, Tracking
+from lib.minimax.algo import SearchContext, SearchTimeout, minimax
+from lib.minimax.transposition import TranspositionTable
+from lib.minimax.ordering import MoveOrdering
+
+# Longest wait for worker results between two looks at the stop flag
+STOP_POLL_SECONDS = 0.05
+
+# Per worker process state, set up by init_worker
+worker_table = None
+worker_ordering = None
+worker_evaluator = None
+worker_tracking = None
+worker_stop = None
+worker_search_id = None
+
+
+def init_worker(table_megabytes, evaluator=None, tracking=Tracking(), stop=None):
+    """stop, a multiprocessing.Event shared with the ParallelRootSearch,
+    ends the searches in flight early.
+    """
+    global worker_table, worker_ordering, worker_evaluator, worker_tracking, worker_stop
+    worker_table = TranspositionTable(table_megabytes)
+    worker_ordering = MoveOrdering()
+    worker_evaluator = evaluator
+    worker_tracking = tracking
+    worker_stop = stop
+
+
+def search_move(size, red, blue, move, depth, color, alpha, deadline, search_id):
+    """Runs in a pool worker: scores one root move of the position given
+    by its masks. Returns None if the deadline passed or the search was
+    stopped first.
+    """
+    global worker_search_id
+    if search_id != worker_search_id:
+        worker_table.new_search()
+        worker_ordering.new_search()
+        worker_search_id = search_id
+
+    board = worker_tracking.apply(Bitboard.from_masks(size, red, blue))
+    board.play(move, color)
+    context = SearchContext(
+        table=worker_table, ordering=worker_ordering,
+        evaluator=worker_evaluator, deadline=deadline, stop=worker_stop)
+    try:
+        return minimax(board, depth, False, color, alpha, float("inf"), context)
+    except SearchTimeout:
+        return None
+
+
+class ParallelRootSearch:
+    """Drop-in replacement for search_root that scores root moves on a
+    process pool. At most one move per worker is in flight; every move
+    submitted after a result arrives uses the best score so far as alpha.
+
+    The search ends early once the context's stop flag is set; stop, the
+    event given to the workers' init_worker, then ends theirs too.
+    """
+
+    def __init__(self, executor, workers, stop=None):
+        self.executor = executor
+        self.workers = workers
+        self.stop = stop
+        self.search_id = 0
+
+    def new_search(self):
+        self.search_id += 1
+        if self.stop is not None:
+            self.stop.clear()
+
+    def __call__(self, board, moves, depth, color, context):
+        order = {move: number for number, move in enumerate(moves)}
+        remaining = list(reversed(moves))
+        running = {}
+        best_move = None
+        best_score = float("-inf")
+
+        def submit():
+            move = remaining.pop()
+            future = self.executor.submit(
+                search_move, board.size, board.red, board.blue, move,
+                depth, color, best_score, context.deadline, self.search_id,
+            )
+            running[future] = move
+
+        try:
+            while remaining and len(running) < self.workers:
+                submit()
+
+            while running:
+                timeout = None
+                if context.deadline is not None:
+                    timeout = max(context.deadline - time.monotonic(), 0)
+                if context.stop is not None:
+                    timeout = STOP_POLL_SECONDS if timeout is None else min(
+                        timeout, STOP_POLL_SECONDS)
+                done, _ = concurrent.futures.wait(
+                    running, timeout=timeout,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                if context.stop is not None and context.stop.is_set():
+                    if self.stop is not None:
+                        self.stop.set()
+                    raise SearchTimeout()
+                if not done:
+                    if context.deadline is None or time.monotonic() < context.deadline:
+                        continue
+                    raise SearchTimeout()
+
+                for future in done:
+                    move = running.pop(future)
+                    score = future.result()
+                    if score is None:
+                        raise SearchTimeout()
+                    if best_move is None or score > best_score or (
+                            score == best_score and order[move] < order[best_move]):
+                        best_move = move
+                        best_score = score
+
+                if best_score == float("inf"):
+                    break
+                while remaining and len(running) < self.workers:
+                    submit()
+        finally:
+            for future in running:
+                future.cancel()
+
+        return best_move, best_score
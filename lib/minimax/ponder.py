@@ -0,0 +1,74 @@
+import threading
+from lib.board.bitboard import Tracking
+from lib.colors import get_oposing_color
+from lib.minimax.algo import SearchContext, get_root_moves, iterative_deepening
+from lib.minimax.transposition import search_key
+from lib.minimax.ordering import MoveOrdering
+
+
+def predict_reply(board, color, table):
+    """The opponent's most likely answer after our move: the refutation
+    stored by our own search, else the first cell of their shortest path.
+    """
+    entry = table.probe(search_key(board, False, color))
+    if entry and entry[3] >= 0:
+        move = board.move_at(entry[3])
+        if board.is_free(move):
+            return move
+    path = board.shortest_path_moves(get_oposing_color(color))
+    if path:
+        return path[0]
+    return None
+
+
+class Ponderer:
+    """Searches in a background thread while the opponent thinks. It
+    plays the predicted reply on a private copy of the board and runs our
+    normal iterative deepening from there, filling the shared table. If
+    the prediction was right, the real search finds most of its tree
+    already stored; if not, the ponder search is stopped within a few
+    nodes and only its table entries remain.
+    """
+
+    def __init__(self, table, max_depth, evaluator=None, tracking=Tracking()):
+        self.table = table
+        self.max_depth = max_depth
+        self.evaluator = evaluator
+        self.tracking = tracking
+        self.thread = None
+        self.predicted = None
+        self.result = None
+
+    def start(self, board, color):
+        self.stop()
+        self.predicted = predict_reply(board, color, self.table)
+        if self.predicted is None:
+            return
+        board = self.tracking.apply(board.copy())
+        board.play(self.predicted, get_oposing_color(color))
+        self.result = None
+        self.stop_flag = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, args=(board, color), daemon=True)
+        self.thread.start()
+
+    def run(self, board, color):
+        if board.winner():
+            return
+        moves = get_root_moves(board, color)
+        context = SearchContext(
+            table=self.table, ordering=MoveOrdering(),
+            evaluator=self.evaluator, stop=self.stop_flag)
+        self.result = iterative_deepening(
+            board, moves, color, None, self.max_depth, context)
+
+    def stop(self, move=None):
+        """Ends pondering. Returns True if the opponent played the
+        predicted move.
+        """
+        if self.thread is None:
+            return False
+        self.stop_flag.set()
+        self.thread.join()
+        self.thread = None
+        return move is not None and move == self.predicted
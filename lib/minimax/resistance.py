@@ -0,0 +1,118 @@
+import functools
+import math
+from lib.board.neighbours import get_neighbour_table, get_edge_cells
+from lib.colors import ColorsEnum, get_oposing_color
+
+# Resistance of a cell holding an own stone; 0 would make the system singular
+OWN_RESISTANCE = 0.01
+FREE_RESISTANCE = 1.0
+# Conductance from every cell to the sink, keeps cut off cells solvable
+LEAK = 1e-9
+MAX_RESISTANCE = 1 / LEAK
+
+
+@functools.lru_cache(maxsize=None)
+def get_resistance_network(size):
+    """Index arrays of one board size: both ends of every cell to cell
+    edge, the edge/cell incidence matrix, and the start and end edge cells
+    of each colour.
+    """
+    import numpy as np
+
+    table = get_neighbour_table(size)
+    pairs = [
+        (cell, neighbour)
+        for cell in range(table.cells)
+        for neighbour in table.cell_neighbours[cell]
+        if cell < neighbour
+    ]
+    first = np.array([pair[0] for pair in pairs])
+    second = np.array([pair[1] for pair in pairs])
+    incidence = np.zeros((len(pairs), table.cells))
+    incidence[np.arange(len(pairs)), first] = 1
+    incidence[np.arange(len(pairs)), second] = 1
+    edges = {}
+    for color in (ColorsEnum.RED, ColorsEnum.BLUE):
+        start, end = get_edge_cells(size, color)
+        edges[color] = (np.array(start), np.array(end))
+    return first, second, incidence, edges
+
+
+def mask_to_array(mask, cells):
+    import numpy as np
+
+    data = np.frombuffer(mask.to_bytes((cells + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(data, bitorder="little")[:cells].astype(bool)
+
+
+def resistances(size, positions, color):
+    """Resistance between the two sides of the colour for each (red, blue)
+    position, all solved in one batched call. Own stones conduct almost
+    freely, free cells are unit resistors and opponent stones are open
+    circuits; the Laplacian of the network is solved for the voltages
+    with the start side at 1 and the end side at 0.
+    """
+    import numpy as np
+
+    cells = size * size
+    first, second, incidence, edges = get_resistance_network(size)
+    start, end = edges[color]
+
+    red = np.array([mask_to_array(position[0], cells) for position in positions])
+    blue = np.array([mask_to_array(position[1], cells) for position in positions])
+    own, other = (red, blue) if color == ColorsEnum.RED else (blue, red)
+    cell_resistance = np.where(own, OWN_RESISTANCE, FREE_RESISTANCE)
+    cell_resistance[other] = np.inf
+
+    with np.errstate(divide="ignore"):
+        conductance = 1 / (cell_resistance[:, first] + cell_resistance[:, second])
+        start_conductance = 1 / cell_resistance[:, start]
+        end_conductance = 1 / cell_resistance[:, end]
+
+    batch = len(positions)
+    laplacian = np.zeros((batch, cells, cells))
+    laplacian[:, first, second] = -conductance
+    laplacian[:, second, first] = -conductance
+    diagonal = conductance @ incidence + LEAK
+    diagonal[:, start] += start_conductance
+    diagonal[:, end] += end_conductance
+    laplacian[:, np.arange(cells), np.arange(cells)] = diagonal
+
+    current_in = np.zeros((batch, cells, 1))
+    current_in[:, start, 0] = start_conductance
+    voltage = np.linalg.solve(laplacian, current_in)[:, :, 0]
+    current = (start_conductance * (1 - voltage[:, start])).sum(axis=1)
+    with np.errstate(divide="ignore"):
+        return np.minimum(1 / current, MAX_RESISTANCE)
+
+
+class ResistanceEvaluator:
+    """Scores a position by log(opponent resistance / own resistance), so
+    positive is good for player_color. Unlike the shortest path
+    difference it sees how many alternative routes each side has. Needs
+    NumPy. evaluate_children lets minimax score every child of a node
+    with one batched solve.
+    """
+
+    def __call__(self, board, player_color):
+        return self.evaluate_positions(
+            board.size, [(board.red, board.blue)], player_color)[0]
+
+    def evaluate_children(self, board, moves, color, player_color):
+        'Scores of the positions after each move of color, in order.'
+        positions = []
+        for move in moves:
+            bit = 1 << (move.i * board.size + move.j)
+            if color == ColorsEnum.RED:
+                positions.append((board.red | bit, board.blue))
+            else:
+                positions.append((board.red, board.blue | bit))
+        return self.evaluate_positions(board.size, positions, player_color)
+
+    def evaluate_positions(self, size, positions, player_color):
+        own = resistances(size, positions, player_color)
+        other = resistances(size, positions, get_oposing_color(player_color))
+        return [
+            math.log(other_resistance / own_resistance)
+            for own_resistance, other_resistance in zip(own.tolist(), other.tolist())
+        ]
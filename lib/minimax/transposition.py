@@ -0,0 +1,118 @@
+import array
+import enum
+import struct
+from lib.colors import ColorsEnum
+
+ENTRY_BYTES = 16
+SCORE_BITS = struct.Struct("<f")
+UINT_BITS = struct.Struct("<I")
+OCCUPIED = 1 << 63
+
+# Mixed into the board hash so the same stones are stored separately for
+# each side to move and each maximizing colour.
+SEARCH_KEYS = {
+    (True, ColorsEnum.RED): 0x3C6EF372FE94F82B,
+    (False, ColorsEnum.RED): 0xA54FF53A5F1D36F1,
+    (True, ColorsEnum.BLUE): 0x510E527FADE682D1,
+    (False, ColorsEnum.BLUE): 0x9B05688C2B3E6C1F,
+}
+
+
+class BoundsEnum(enum.IntEnum):
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+
+def table_slots(megabytes):
+    'Largest power of two number of slots that fits in the memory cap.'
+    slots = 1
+    while slots * 2 * ENTRY_BYTES <= megabytes * 1024 * 1024:
+        slots *= 2
+    return slots
+
+
+def search_key(board, isMaximizingPlayer, maximixing_color):
+    return board.hash ^ SEARCH_KEYS[(isMaximizingPlayer, maximixing_color)]
+
+
+class TranspositionTable:
+    """Fixed size, always-allocated hash table for alpha-beta results.
+
+    Each slot holds two 64 bit words: the position key xor-ed with the
+    packed entry, and the packed entry itself (score as float32, depth,
+    bound, generation and best move). A slot is only trusted when both
+    words agree, so a torn write reads as a miss instead of a wrong score.
+
+    Replacement: entries from an older search generation are always
+    overwritten; within the current generation the deeper entry wins.
+
+    The slots can live in a caller-provided buffer (at least
+    table_slots(megabytes) * ENTRY_BYTES long), e.g. shared memory that
+    several processes read and write without locks.
+    """
+
+    def __init__(self, megabytes=16, buffer=None):
+        self.mask = table_slots(megabytes) - 1
+        self.buffer = buffer
+        self.generation = 1
+        if buffer is None:
+            self.clear()
+        else:
+            slots = self.mask + 1
+            self.view = memoryview(buffer)[:slots * ENTRY_BYTES].cast("Q")
+            self.keys = self.view[:slots]
+            self.entries = self.view[slots:]
+
+    def __len__(self):
+        return self.mask + 1
+
+    def new_search(self):
+        'Ages every stored entry. Call once per move.'
+        self.generation = self.generation % 63 + 1
+
+    def clear(self):
+        slots = self.mask + 1
+        if self.buffer is None:
+            self.keys = array.array("Q", bytes(slots * 8))
+            self.entries = array.array("Q", bytes(slots * 8))
+        else:
+            self.buffer[:slots * ENTRY_BYTES] = bytes(slots * ENTRY_BYTES)
+        self.generation = 1
+
+    def release(self):
+        'Drops the views into a caller-provided buffer so it can be closed.'
+        if self.buffer is not None:
+            self.keys.release()
+            self.entries.release()
+            self.view.release()
+
+    def probe(self, key):
+        'Returns (score, depth, bound, move) or None.'
+        slot = key & self.mask
+        entry = self.entries[slot]
+        if not entry or self.keys[slot] ^ entry != key:
+            return None
+        score = SCORE_BITS.unpack(UINT_BITS.pack(entry & 0xFFFFFFFF))[0]
+        depth = (entry >> 32) & 0xFF
+        bound = BoundsEnum((entry >> 40) & 0x3)
+        move = ((entry >> 48) & 0x7FFF) - 1
+        return score, depth, bound, move
+
+    def store(self, key, score, depth, bound, move=-1):
+        slot = key & self.mask
+        old = self.entries[slot]
+        if old and (old >> 42) & 0x3F == self.generation \
+                and (old >> 32) & 0xFF > depth:
+            return
+
+        entry = (
+            OCCUPIED
+            | (move + 1) << 48
+            | self.generation << 42
+            | int(bound) << 40
+            | min(depth, 0xFF) << 32
+            | UINT_BITS.unpack(SCORE_BITS.pack(score))[0]
+        )
+        self.keys[slot] = key ^ entry
+        self.entries[slot] = entry
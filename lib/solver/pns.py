@@ -0,0 +1,179 @@
+import dataclasses
+import time
+from typing import Any
+from lib.colors import ColorsEnum, get_oposing_color
+
+INFINITY = 10 ** 9
+# df-pn 1+epsilon: child thresholds grow by this factor, so the search
+# stays longer in one subtree instead of thrashing between siblings
+EPSILON = 0.25
+# How many nodes are searched between two clock reads
+CHECK_EVERY_NODES = 256
+# Mixed into the board hash so both sides to move are stored separately
+TO_MOVE_KEYS = {
+    ColorsEnum.RED: 0x6A09E667F3BCC908,
+    ColorsEnum.BLUE: 0xBB67AE8584CAA73B,
+}
+
+
+class SolverTimeout(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class SolverResult:
+    """A solved position: won says whether the side to move wins, move is
+    the winning move, or the move whose refutation took the most work if
+    the position is lost.
+    """
+    move: Any
+    won: bool
+    nodes: int
+
+
+def get_threats(board, color):
+    'Cells where the colour would connect right away.'
+    if board.connection_distance(color, virtual=False) != 1:
+        return []
+    threats = []
+    for move in board.free_moves():
+        board.play(move, color)
+        if board.winner() == color:
+            threats.append(move)
+        board.undo()
+    return threats
+
+
+class ProofNumberSearch:
+    """Depth-first proof-number search (df-pn) of Hex endgames. Every
+    node stores (phi, delta, work) from the side to move's point of view:
+    phi is the proof number of "the side to move wins", delta the
+    disproof number and work the nodes spent below it. There are no draws
+    in Hex, so a disproof is a win for the opponent.
+
+    Terminal positions come from the board's union-find (call
+    track_connections first). Immediate wins and single threats are read
+    off before expanding: a side facing two threats it cannot block at
+    once has lost, and facing one it must block it. The table is kept
+    between calls, as later positions reuse most of it.
+    """
+
+    def __init__(self, max_entries=2_000_000):
+        self.max_entries = max_entries
+        self.table = {}
+        self.nodes = 0
+        self.deadline = None
+        self.stop = None
+
+    def key(self, board, color):
+        return board.hash ^ TO_MOVE_KEYS[color]
+
+    def lookup(self, board, color):
+        return self.table.get(self.key(board, color), (1, 1, 0))
+
+    def solve(self, board, color, deadline=None, stop=None):
+        """Solves the position for the colour to move. Returns a
+        SolverResult, or None if the deadline (a time.monotonic() value)
+        passed or the stop flag was set first.
+        """
+        if len(self.table) > self.max_entries:
+            self.table.clear()
+        self.nodes = 0
+        self.deadline = deadline
+        self.stop = stop
+        try:
+            self.mid(board, color, INFINITY, INFINITY)
+        except SolverTimeout:
+            return None
+
+        won = self.lookup(board, color)[0] == 0
+        opponent = get_oposing_color(color)
+        best_move = None
+        best_work = None
+        # Facing threats, only blocking one of them can be resilient
+        for move in get_threats(board, opponent) or board.free_moves():
+            board.play(move, color)
+            if board.winner() == color:
+                board.undo()
+                return SolverResult(move, True, self.nodes)
+            _, child_delta, work = self.lookup(board, opponent)
+            board.undo()
+            if won:
+                # The proven child that took the least work to refute
+                if child_delta == 0 and (best_work is None or work < best_work):
+                    best_move, best_work = move, work
+            elif best_work is None or work > best_work:
+                best_move, best_work = move, work
+        return SolverResult(best_move, won, self.nodes)
+
+    def visit(self):
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY_NODES == 0:
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                raise SolverTimeout()
+            if self.stop is not None and self.stop.is_set():
+                raise SolverTimeout()
+
+    def get_children(self, board, color):
+        """Moves worth trying for the side to move, or a solved (phi,
+        delta) pair for positions decided by threats alone.
+        """
+        if get_threats(board, color):
+            return (0, INFINITY)
+        threats = get_threats(board, get_oposing_color(color))
+        if len(threats) > 1:
+            return (INFINITY, 0)
+        if threats:
+            return threats
+        return board.free_moves()
+
+    def mid(self, board, color, phi_threshold, delta_threshold):
+        """Expands the position until its phi or delta reaches the
+        threshold, storing what it learns in the table.
+        """
+        self.visit()
+        key = self.key(board, color)
+        nodes_before = self.nodes
+        winner = board.winner()
+        if winner != ColorsEnum.FREE:
+            self.table[key] = (0, INFINITY, 0) if winner == color else (INFINITY, 0, 0)
+            return
+
+        moves = self.get_children(board, color)
+        if isinstance(moves, tuple):
+            self.table[key] = moves + (0,)
+            return
+
+        opponent = get_oposing_color(color)
+        work = self.table.get(key, (1, 1, 0))[2]
+        while True:
+            # A child's phi is our delta and its delta our phi
+            phi = INFINITY
+            delta = 0
+            best = None
+            best_delta = second_delta = INFINITY
+            best_phi = 0
+            for move in moves:
+                board.play(move, color)
+                child_phi, child_delta, _ = self.lookup(board, opponent)
+                board.undo()
+                phi = min(phi, child_delta)
+                delta = min(delta + child_phi, INFINITY)
+                if child_delta < best_delta:
+                    best, second_delta = move, best_delta
+                    best_delta, best_phi = child_delta, child_phi
+                elif child_delta < second_delta:
+                    second_delta = child_delta
+
+            self.table[key] = (phi, delta, work + self.nodes - nodes_before)
+            if phi >= phi_threshold or delta >= delta_threshold:
+                return
+
+            child_phi_threshold = delta_threshold - delta + best_phi
+            child_delta_threshold = min(
+                phi_threshold, int(second_delta * (1 + EPSILON)) + 1)
+            board.play(best, color)
+            try:
+                self.mid(board, opponent, child_phi_threshold, child_delta_threshold)
+            finally:
+                board.undo()
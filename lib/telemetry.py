@@ -0,0 +1,40 @@
+import dataclasses
+import json
+import math
+
+
+@dataclasses.dataclass
+class SearchStats:
+    """Counters of one move's search, filled in by minimax when a
+    SearchContext carries them. Searches without stats pay one None check
+    per counted event and never read the clock for them. nodes is copied
+    from the context once the search is over.
+    """
+    nodes: int = 0
+    evaluations: int = 0
+    table_hits: int = 0
+    table_misses: int = 0
+    cutoffs: int = 0
+    move_generation_seconds: float = 0.0
+    evaluation_seconds: float = 0.0
+
+
+class TelemetryLog:
+    """Appends one JSON object per line to a file, flushed at once so a
+    game that is killed still leaves every finished move in the log.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def write(self, record):
+        # Won and lost scores are infinite, which JSON has no literal for
+        record = {
+            key: str(value) if isinstance(value, float) and math.isinf(value) else value
+            for key, value in record.items()
+        }
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,57 @@
+import asyncio
+
+
+def parse_message(line):
+    'Fields of one protocol line; [""] at the end of the stream.'
+    return line.decode("utf-8").strip().split(";")
+
+
+class MessageStream:
+    """The agent's connection to the game server: newline-framed
+    messages over asyncio streams. The StreamReader buffers whatever TCP
+    delivers, so two messages in one segment, or one message split over
+    several, still come out one whole message per read.
+
+    next_message() starts reading the next message in the background, so
+    the agent can watch the socket while a search runs; receive() takes
+    that same message once it is complete.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = None
+
+    @classmethod
+    async def connect(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def read(self):
+        return parse_message(await self.reader.readline())
+
+    def next_message(self):
+        'The task reading the next message, started if need be.'
+        if self.pending is None:
+            self.pending = asyncio.ensure_future(self.read())
+        return self.pending
+
+    async def receive(self):
+        task = self.next_message()
+        try:
+            return await task
+        finally:
+            self.pending = None
+
+    async def send(self, message):
+        self.writer.write(message.encode("utf-8"))
+        await self.writer.drain()
+
+    async def close(self):
+        if self.pending is not None:
+            self.pending.cancel()
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except OSError:
+            pass
@@ -0,0 +1,21 @@
+import time
+from Agent import MinMaxAgent
+from lib.board.bitboard import Bitboard
+from lib.engines import EnginesEnum
+
+
+def test_lazy_smp_without_helpers_searches_serially():
+    agent = MinMaxAgent()
+    agent.ENGINE = EnginesEnum.LAZY_SMP
+    agent.WORKERS = 1
+    agent.setup_search()
+    assert agent.ENGINE == EnginesEnum.SERIAL
+
+    agent._board = agent._tracking.apply(Bitboard(5))
+    agent._book = None
+    agent._colour = "R"
+    agent._time_used = 0
+    agent.TIMEOUT_SECONDS = 0.2
+    record = {}
+    assert agent.choose_move(record, None, time.monotonic())
+    assert record["source"] in ("minimax", "solver")
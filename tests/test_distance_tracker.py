@@ -0,0 +1,72 @@
+import heapq
+import random
+import pytest
+from lib.board.bitboard import Bitboard
+from lib.board.neighbours import get_cell_neighbours, get_edge_cells
+from lib.colors import ColorsEnum
+
+INFINITY = float("inf")
+
+
+def dijkstra_distance(board, color):
+    'Cell-by-cell Dijkstra: free cells cost 1, own stones 0.'
+    size = board.size
+    own = board.stones(color)
+    other = board.stones(ColorsEnum.BLUE if color == ColorsEnum.RED else ColorsEnum.RED)
+    neighbours = get_cell_neighbours(size)
+    start, end = get_edge_cells(size, color)
+
+    def weight(cell):
+        if own >> cell & 1:
+            return 0
+        if other >> cell & 1:
+            return INFINITY
+        return 1
+
+    dist = [INFINITY] * (size * size)
+    pending = []
+    for cell in start:
+        if weight(cell) < dist[cell]:
+            dist[cell] = weight(cell)
+            heapq.heappush(pending, (dist[cell], cell))
+    while pending:
+        distance, cell = heapq.heappop(pending)
+        if distance > dist[cell]:
+            continue
+        for neighbour in neighbours[cell]:
+            if distance + weight(neighbour) < dist[neighbour]:
+                dist[neighbour] = distance + weight(neighbour)
+                heapq.heappush(pending, (dist[neighbour], neighbour))
+    return min(dist[cell] for cell in end)
+
+
+def check(board, plain, colors=(ColorsEnum.RED, ColorsEnum.BLUE), layers=True):
+    for color in colors:
+        # The distance alone is often answered from the previous position
+        assert board.connection_distance(color) == dijkstra_distance(board, color)
+        if layers:
+            assert board.distances.levels(board, color) == plain.distance_levels(color)
+            assert board.shortest_path_moves(color) == plain.shortest_path_moves(color)
+
+
+@pytest.mark.parametrize("size", range(1, 10))
+@pytest.mark.parametrize("seed", range(5))
+def test_play_undo_matches_full_search(size, seed):
+    generator = random.Random(seed)
+    board = Bitboard(size)
+    board.track_distances()
+    for _ in range(size * size * 3):
+        free = board.free_moves()
+        if board.history and (not free or generator.random() < 0.35):
+            board.undo()
+        elif free:
+            color = generator.choice((ColorsEnum.RED, ColorsEnum.BLUE))
+            board.play(generator.choice(free), color)
+        plain = board.copy()
+        # Ask after only some moves and for one colour at times, so
+        # repairs start from positions several stones back
+        if generator.random() < 0.6:
+            check(board, plain, generator.choice(
+                ((ColorsEnum.RED,), (ColorsEnum.BLUE,), (ColorsEnum.RED, ColorsEnum.BLUE))),
+                generator.random() < 0.5)
+    check(board, board.copy())
@@ -0,0 +1,99 @@
+import random
+import pytest
+from lib.board.bitboard import Bitboard
+from lib.board.moves import Move, get_possible_moves
+from lib.board.move_algos import get_active_moves_path
+from lib.colors import ColorsEnum, get_oposing_color
+from lib.minimax.algo import minimax, search_root, SearchContext
+from lib.minimax.eval import evaluation
+
+POSITIONS = [(size, stones, seed) for size in (5, 7, 9) for stones in (4, 9) for seed in range(4)]
+
+
+def copy_minimax(board, depth, isMaximizingPlayer, maximixing_color, alpha, beta):
+    'The old search: every child is a fresh copy of the board.'
+    winner = board.winner()
+    if winner != ColorsEnum.FREE:
+        return float("inf") if winner == maximixing_color else float("-inf")
+    if depth == 0:
+        return evaluation(board.copy(), maximixing_color)
+    moves = get_active_moves_path(board.copy())
+    if not moves:
+        return evaluation(board.copy(), maximixing_color)
+
+    if isMaximizingPlayer:
+        color = maximixing_color
+        bestValue = float("-inf")
+    else:
+        color = get_oposing_color(maximixing_color)
+        bestValue = float("inf")
+    for move in moves:
+        child = board.copy()
+        child.play(move, color)
+        value = copy_minimax(child, depth - 1, not isMaximizingPlayer, maximixing_color, alpha, beta)
+        if isMaximizingPlayer:
+            bestValue = max(bestValue, value)
+            if bestValue >= beta:
+                break
+            alpha = max(alpha, bestValue)
+        else:
+            bestValue = min(bestValue, value)
+            if bestValue <= alpha:
+                break
+            beta = min(beta, bestValue)
+    return bestValue
+
+
+def copy_search_root(board, moves, depth, color):
+    best_move = None
+    best_score = float("-inf")
+    for move in moves:
+        child = board.copy()
+        child.play(move, color)
+        score = copy_minimax(child, depth, False, color, best_score, float("inf"))
+        if best_move is None or score > best_score:
+            best_move = move
+            best_score = score
+        if best_score == float("inf"):
+            break
+    return best_move, best_score
+
+
+def random_position(size, stones, seed):
+    generator = random.Random(seed)
+    board = Bitboard(size)
+    cells = [Move(i, j) for i in range(size) for j in range(size)]
+    generator.shuffle(cells)
+    for index, move in enumerate(cells[:stones]):
+        board.play(move, ColorsEnum.RED if index % 2 == 0 else ColorsEnum.BLUE)
+    board.history = []
+    return board
+
+
+@pytest.mark.parametrize("size,stones,seed", POSITIONS)
+@pytest.mark.parametrize("color", [ColorsEnum.RED, ColorsEnum.BLUE])
+def test_same_best_move_as_copying_search(size, stones, seed, color):
+    board = random_position(size, stones, seed)
+    board.track_connections()
+    random.seed(seed)
+    moves = get_possible_moves(board)[:8]
+    before = (list(board.history), board.red, board.blue, board.hash)
+
+    random.seed(seed)
+    expected = copy_search_root(board.copy(), moves, 2, color)
+    random.seed(seed)
+    found = search_root(board, moves, 2, color, SearchContext())
+
+    assert found == expected
+    assert (board.history, board.red, board.blue, board.hash) == before
+
+
+@pytest.mark.parametrize("size,stones,seed", POSITIONS)
+def test_minimax_leaves_board_unchanged(size, stones, seed):
+    board = random_position(size, stones, seed)
+    before = (list(board.history), board.red, board.blue, board.hash)
+    random.seed(seed)
+    expected = copy_minimax(board.copy(), 2, True, ColorsEnum.RED, float("-inf"), float("inf"))
+    random.seed(seed)
+    assert minimax(board, 2, True, ColorsEnum.RED, float("-inf"), float("inf")) == expected
+    assert (board.history, board.red, board.blue, board.hash) == before
@@ -0,0 +1,23 @@
+import threading
+from lib.board.bitboard import Bitboard
+from lib.board.moves import Move
+from lib.colors import ColorsEnum
+from lib.minimax.ponder import Ponderer
+from lib.minimax.transposition import TranspositionTable
+
+
+def test_starting_again_stops_the_running_search():
+    board = Bitboard(7)
+    board.track_connections()
+    board.play(Move(3, 3), ColorsEnum.RED)
+    ponderer = Ponderer(TranspositionTable(1), max_depth=20)
+    threads = threading.active_count()
+
+    ponderer.start(board, ColorsEnum.RED)
+    first = ponderer.thread
+    ponderer.start(board, ColorsEnum.RED)
+    assert not first.is_alive()
+    assert threading.active_count() == threads + 1
+
+    ponderer.stop()
+    assert threading.active_count() == threads
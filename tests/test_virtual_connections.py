@@ -0,0 +1,74 @@
+import random
+from lib.board.bitboard import Bitboard
+from lib.board.moves import Move
+from lib.board.virtual import VirtualConnections
+from lib.colors import ColorsEnum
+from lib.minimax.algo import get_winning_move
+from lib.solver.pns import get_threats
+
+
+def get_column_board():
+    'Red holds (0..3, 2) on 5x5 and connects at (4, 1) or (4, 2).'
+    board = Bitboard(5)
+    board.track_connections()
+    board.track_virtual_connections()
+    for i in range(4):
+        board.play(Move(i, 2), ColorsEnum.RED)
+    return board
+
+
+def test_virtual_distance_counts_templates():
+    board = get_column_board()
+    assert board.connection_distance(ColorsEnum.RED) == 0
+    assert board.connection_distance(ColorsEnum.RED, virtual=False) == 1
+
+
+def test_immediate_win_is_found_with_virtual_connections():
+    board = get_column_board()
+    assert get_winning_move(board, ColorsEnum.RED) in (Move(4, 1), Move(4, 2))
+    assert sorted(get_threats(board, ColorsEnum.RED), key=str) == [Move(4, 1), Move(4, 2)]
+
+
+def get_links(board, color, virtual=None):
+    'Cells and edge of the holding links, whichever anchor came last.'
+    virtual = virtual or board.virtual
+    return sorted(
+        (sorted(link.cells), link.edge) for link in virtual.connections(board, color))
+
+
+def play_stones(stones):
+    board = Bitboard(5)
+    board.track_connections()
+    board.track_virtual_connections()
+    for cell, color in stones:
+        board.play(Move(*divmod(cell, 5)), color)
+    return board
+
+
+def test_virtual_connections_do_not_depend_on_move_order():
+    R, B = ColorsEnum.RED, ColorsEnum.BLUE
+    stones = [(21, B), (14, R), (3, B), (6, R), (24, R), (10, R), (4, R), (17, B), (18, B), (8, B)]
+    in_history_order = play_stones(stones)
+    in_cell_order = play_stones(sorted(stones))
+    for color in (R, B):
+        assert get_links(in_history_order, color) == get_links(in_cell_order, color)
+        assert in_history_order.connection_distance(color) \
+            == in_cell_order.connection_distance(color)
+
+
+def test_virtual_connections_match_a_fresh_load():
+    rng = random.Random(0)
+    for size in (4, 5, 7):
+        board = Bitboard(size)
+        board.track_connections()
+        board.track_virtual_connections()
+        for _ in range(1000):
+            free = [cell for cell in range(size * size) if not (board.red | board.blue) >> cell & 1]
+            if board.history and (not free or rng.random() < 0.3):
+                board.undo()
+            else:
+                cell = rng.choice(free)
+                board.play(Move(*divmod(cell, size)), rng.choice((ColorsEnum.RED, ColorsEnum.BLUE)))
+            fresh = VirtualConnections(board)
+            for color in (ColorsEnum.RED, ColorsEnum.BLUE):
+                assert get_links(board, color) == get_links(board, color, fresh)